@@ -0,0 +1,146 @@
+"""Xuất báo cáo đầu tư cho toàn bộ cổ đông (không cần mở giao diện Streamlit).
+
+Mỗi cổ đông một file, cùng cột và sheet tổng kết với nút tải báo cáo trên trang.
+Các ID được chia thành từng nhóm cho một process pool; file được ghi dần vào
+thư mục hoặc file zip ngay khi mỗi nhóm xong.
+
+Chạy:
+    python batch_export.py --output bao_cao/
+    python batch_export.py --zip bao_cao.zip --format csv --workers 8
+    python batch_export.py --output bao_cao/ --price 11417   # thêm NAV, XIRR, TWR
+    python batch_export.py --snapshots nav_cuoi_ky.csv       # NAV cuối mỗi tháng của mọi cổ đông
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from shareholder_core import (
+    COL_SHAREHOLDER, DATA_FILE, PRICE_FILE, REPORT_FORMATS, LedgerError,
+    batch_returns, build_id_index, build_nav_snapshots, create_download_data, ledger_price_history,
+    read_price_history, read_transactions, report_file_name,
+)
+
+IDS_PER_TASK = 200  # Số cổ đông mỗi tác vụ gửi sang process con
+
+
+def export_chunk(chunk_df, file_format, price=None, returns=None):
+    """Tạo báo cáo cho mọi cổ đông trong một nhóm, trả về [(tên file, bytes)]
+    
+    `returns` là phần bảng lợi suất (batch_returns) của các cổ đông trong nhóm.
+    """
+    sorted_df, positions = build_id_index(chunk_df)
+    reports = []
+    for shareholder_id, rows in positions.items():
+        shareholder_data = sorted_df.iloc[rows]
+        shareholder_name = shareholder_data[COL_SHAREHOLDER].iloc[0]
+        holder_returns = None if returns is None else returns.loc[shareholder_id]
+        data = create_download_data(shareholder_data, shareholder_name, file_format, price, holder_returns)
+        reports.append((report_file_name(shareholder_id, file_format), data))
+    return reports
+
+
+def iter_chunks(sorted_df, positions, ids_per_task=IDS_PER_TASK):
+    """Chia sổ giao dịch thành các nhóm cổ đông, trả về (các ID, DataFrame con) của mỗi nhóm"""
+    ids = list(positions)
+    for start in range(0, len(ids), ids_per_task):
+        chunk_ids = ids[start:start + ids_per_task]
+        rows = np.concatenate([positions[key] for key in chunk_ids])
+        yield chunk_ids, sorted_df.iloc[np.sort(rows)]
+
+
+def export_all(output, file_format='xlsx', workers=None, as_zip=False, source_path=DATA_FILE, price=None):
+    """Xuất báo cáo cho mọi cổ đông, trả về (số file, tổng byte, số giây)
+    
+    Có `price` thì mỗi báo cáo thêm NAV, XIRR và TWR; lợi suất của cả quỹ được tính
+    một lần ở process chính rồi chia theo nhóm.
+    """
+    start = time.perf_counter()
+    try:
+        df, holders, _ = read_transactions(source_path)
+    except LedgerError as e:
+        raise SystemExit(f"Không đọc được dữ liệu từ {source_path}: {e}")
+    sorted_df, positions = build_id_index(df)
+    returns = None if price is None else batch_returns((sorted_df, positions), holders, price)
+    
+    if as_zip:
+        sink = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+        write = sink.writestr
+    else:
+        os.makedirs(output, exist_ok=True)
+        sink = None
+        
+        def write(file_name, data):
+            with open(os.path.join(output, file_name), 'wb') as f:
+                f.write(data)
+    
+    n_files = n_bytes = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(export_chunk, chunk, file_format, price, None if returns is None else returns.loc[ids])
+                for ids, chunk in iter_chunks(sorted_df, positions)
+            ]
+            for future in as_completed(futures):
+                for file_name, data in future.result():
+                    write(file_name, data)
+                    n_files += 1
+                    n_bytes += len(data)
+                elapsed = time.perf_counter() - start
+                print(f"\r{n_files}/{len(positions)} báo cáo · {n_files / elapsed:,.0f} báo cáo/giây", end='', file=sys.stderr)
+    finally:
+        if sink is not None:
+            sink.close()
+    print(file=sys.stderr)
+    return n_files, n_bytes, time.perf_counter() - start
+
+
+def export_snapshots(output, source_path=DATA_FILE, price_path=PRICE_FILE):
+    """Ghi NAV cuối mỗi kỳ của mọi cổ đông ra một file CSV, trả về (số dòng, số giây)
+    
+    Giá lấy từ `price_path` nếu có file, ngược lại suy từ giá mua trong sổ (như trang tra cứu).
+    """
+    start = time.perf_counter()
+    try:
+        df, holders, _ = read_transactions(source_path)
+        id_index = build_id_index(df)
+        prices = read_price_history(price_path) if os.path.exists(price_path) else ledger_price_history(id_index)
+    except LedgerError as e:
+        raise SystemExit(f"Không đọc được dữ liệu: {e}")
+    table = build_nav_snapshots(id_index, holders, prices)['table']
+    table.to_csv(output, index=False, date_format='%d/%m/%Y', encoding='utf-8-sig')
+    return len(table), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Xuất báo cáo đầu tư cho toàn bộ cổ đông")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help="Thư mục ghi báo cáo")
+    target.add_argument('--zip', help="Ghi tất cả báo cáo vào một file zip")
+    target.add_argument('--snapshots', help="Ghi NAV cuối mỗi kỳ của mọi cổ đông vào một file CSV")
+    parser.add_argument('--format', choices=[ext for ext, _ in REPORT_FORMATS.values()], default='xlsx')
+    parser.add_argument('--workers', type=int, default=None, help="Số process (mặc định: số CPU)")
+    parser.add_argument('--source', default=DATA_FILE, help="File CSV nguồn")
+    parser.add_argument('--price', type=float, help="Giá ĐVĐT để thêm NAV, XIRR và TWR vào báo cáo")
+    parser.add_argument('--prices', default=PRICE_FILE, help="File giá ĐVĐT theo ngày cho --snapshots")
+    args = parser.parse_args(argv)
+    
+    if args.snapshots:
+        n_rows, seconds = export_snapshots(args.snapshots, args.source, args.prices)
+        print(f"Đã ghi {n_rows:,} dòng NAV cuối kỳ vào {args.snapshots} trong {seconds:.1f} giây")
+        return
+    
+    n_files, n_bytes, seconds = export_all(
+        args.zip or args.output, args.format, args.workers, as_zip=bool(args.zip), source_path=args.source,
+        price=args.price,
+    )
+    print(f"Đã xuất {n_files:,} báo cáo ({n_bytes / 2**20:,.1f} MB) trong {seconds:.1f} giây "
+          f"- {n_files / seconds:,.0f} báo cáo/giây")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""So sánh tính NAV/hiệu suất cho mọi cổ đông: vòng lặp từng ID và batch_nav (một lượt NumPy).
+
+Chạy: python benchmarks/bench_batch_nav.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shareholder_core import (  # noqa: E402
+    COL_QUANTITY_DVDT_CLEAN, COL_TOTAL_MONEY_CLEAN, batch_nav, calculate_performance,
+)
+
+CASES = [(1_000, 12), (10_000, 100), (10_000, 500)]
+
+
+def make_holders(n_holders, seed=0):
+    rng = np.random.default_rng(seed)
+    invested = rng.integers(1, 100, n_holders) * 1_000_000
+    return pd.DataFrame({
+        COL_TOTAL_MONEY_CLEAN: invested,
+        COL_QUANTITY_DVDT_CLEAN: invested / rng.uniform(9_000, 12_000, n_holders),
+    }, index=[f"HOLDER{i:08d}" for i in range(n_holders)])
+
+
+def loop_nav(holders, prices):
+    """Cách tính từng cổ đông, từng mức giá như trang tra cứu"""
+    rows = []
+    for invested, units in zip(holders[COL_TOTAL_MONEY_CLEAN], holders[COL_QUANTITY_DVDT_CLEAN]):
+        rows.append([calculate_performance(units * price, invested) for price in prices])
+    return rows
+
+
+def main():
+    print(f"{'holders':>8} {'prices':>7} {'loop ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for n_holders, n_prices in CASES:
+        holders = make_holders(n_holders)
+        prices = np.linspace(8_000, 14_000, n_prices)
+        start = time.perf_counter()
+        loop_nav(holders, prices)
+        loop_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        batch_nav(holders, prices)
+        batch_ms = (time.perf_counter() - start) * 1000
+        print(f"{n_holders:>8,} {n_prices:>7} {loop_ms:>9.1f} {batch_ms:>9.1f} {loop_ms / batch_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""So sánh tra cứu ID: quét toàn bảng (cách cũ) và chỉ mục dựng sẵn.
+
+Chạy: python benchmarks/bench_id_lookup.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shareholder_core import (  # noqa: E402
+    COL_DATE_DATETIME, COL_ID, COL_QUANTITY_DVDT_CLEAN, COL_TOTAL_MONEY_CLEAN, build_id_index,
+    lookup_shareholder,
+)
+
+SIZES = [10_000, 100_000, 1_000_000]
+N_LOOKUPS = 20
+
+
+def make_frame(n_rows, seed=0):
+    """Tạo bảng giao dịch giả lập với ~10 giao dịch mỗi cổ đông (kèm cột tiền/ĐVĐT cho lũy kế)"""
+    rng = np.random.default_rng(seed)
+    n_holders = max(1, n_rows // 10)
+    holder = rng.integers(0, n_holders, n_rows)
+    ids = pd.Series([f"HOLDER{h:08d}" for h in range(n_holders)]).iloc[holder].to_numpy()
+    dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D')
+    amounts = rng.integers(1, 11, n_rows) * 10_000_000
+    return pd.DataFrame({
+        COL_ID: ids,
+        COL_DATE_DATETIME: dates,
+        COL_TOTAL_MONEY_CLEAN: amounts,
+        COL_QUANTITY_DVDT_CLEAN: amounts / 10_000,
+    }), n_holders
+
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    print(f"{'rows':>10} {'scan ms':>10} {'build ms':>10} {'index ms':>10} {'speedup':>9}")
+    for n_rows in SIZES:
+        df, n_holders = make_frame(n_rows)
+        targets = [f"HOLDER{h:08d}" for h in np.linspace(0, n_holders - 1, N_LOOKUPS, dtype=int)]
+
+        def scan():
+            for target in targets:
+                df[df[COL_ID].str.upper() == target].copy().sort_values(COL_DATE_DATETIME)
+
+        build_ms = timeit(lambda: build_id_index(df), 1)
+        id_index = build_id_index(df)
+
+        def indexed():
+            for target in targets:
+                lookup_shareholder(id_index, target)
+
+        scan_ms = timeit(scan, 1) / N_LOOKUPS
+        index_ms = timeit(indexed, 3) / N_LOOKUPS
+        print(f"{n_rows:>10,} {scan_ms:>10.3f} {build_ms:>10.1f} {index_ms:>10.3f} {scan_ms / index_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
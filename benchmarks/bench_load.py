@@ -0,0 +1,114 @@
+"""So sánh thời gian tải nguội: clean_money qua Series.apply và parse_money vector hóa.
+
+Tạo file CSV giả lập bằng cách nhân bản dữ liệu mẫu, rồi đo riêng từng phần:
+    apply / parse_money   đọc CSV + làm sạch 3 cột tiền: cách cũ đọc "10,000,000"
+                          thành chuỗi rồi apply từng ô; cách mới đọc bằng
+                          thousands=',' (bộ đọc C ra số luôn) rồi parse_money
+    legacy / cold load    đọc CSV + lọc + làm sạch theo cách cũ so với
+                          parse_csv_bytes() + clean_transactions() (kèm kiểm tra
+                          STK và thu gọn kiểu dữ liệu)
+    snapshot              read_transactions() khi đọc lại từ bản chụp Feather
+
+Chạy: python benchmarks/bench_load.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shareholder_core import clean_transactions, parse_csv_bytes, parse_money, read_transactions  # noqa: E402
+
+COPIES = [10, 100, 1000]
+MONEY_COLUMNS = (1, 9, 10)  # Tổng, Giá 1 ĐVĐT, Số lượng ĐVĐT
+
+
+def clean_money(value):
+    """Cách làm sạch cũ, giữ lại để so sánh"""
+    if pd.isna(value):
+        return 0
+    value_str = str(value).replace(',', '').replace(' ', '').replace('"', '')
+    try:
+        return float(value_str)
+    except ValueError:
+        return 0
+
+
+def write_ledger(path, copies):
+    """Ghi file CSV gồm header mẫu và phần thân mẫu lặp lại `copies` lần"""
+    with open(os.path.join(ROOT, 'data_shareholders.csv'), 'rb') as f:
+        header, body = f.read().split(b'\n', 1)
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    with open(path, 'wb') as f:
+        f.write(header + b'\n')
+        for _ in range(copies):
+            f.write(body)
+
+
+def elapsed_ms(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def legacy_load():
+    """Quy trình tải cũ: không dùng thousands, làm sạch tiền bằng apply từng ô"""
+    df = pd.read_csv('data_shareholders.csv', encoding='latin-1')
+    mask = (
+        df.iloc[:, 0].notna() & df.iloc[:, 1].notna() &
+        df.iloc[:, 7].notna() & df.iloc[:, 8].notna() &
+        ~df.iloc[:, 0].astype(str).str.startswith('-')
+    )
+    main_transactions = df[mask].copy()
+    for col in MONEY_COLUMNS:
+        main_transactions[f'clean_{col}'] = main_transactions.iloc[:, col].apply(clean_money)
+    main_transactions['date'] = pd.to_datetime(main_transactions.iloc[:, 0], format='%d/%m/%Y', errors='coerce')
+    return main_transactions
+
+
+def legacy_money():
+    """Cách cũ: cột tiền được đọc thành chuỗi, làm sạch bằng apply từng ô"""
+    df = pd.read_csv('data_shareholders.csv', encoding='latin-1')
+    return [df.iloc[:, col].apply(clean_money) for col in MONEY_COLUMNS]
+
+
+def vectorized_money():
+    """Cách mới: bộ đọc C bỏ dấu phân cách hàng nghìn, parse_money chỉ còn đổi kiểu"""
+    df = pd.read_csv('data_shareholders.csv', encoding='latin-1', thousands=',')
+    return [parse_money(df.iloc[:, col]) for col in MONEY_COLUMNS]
+
+
+def vectorized_load():
+    """Quy trình tải hiện tại khi chưa có bản chụp: đọc + làm sạch vector hóa"""
+    with open('data_shareholders.csv', 'rb') as f:
+        df, _ = parse_csv_bytes(f.read())
+    return clean_transactions(df)
+
+
+def main():
+    print(f"{'rows':>9} {'apply ms':>9} {'parse_money ms':>15} {'speedup':>8} "
+          f"{'legacy ms':>10} {'cold load ms':>13} {'speedup':>8} {'snapshot ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for copies in COPIES:
+            write_ledger('data_shareholders.csv', copies)
+            n_rows = len(pd.read_csv('data_shareholders.csv', encoding='latin-1', usecols=[0]))
+            apply_ms = elapsed_ms(legacy_money)
+            parse_ms = elapsed_ms(vectorized_money)
+            
+            legacy_ms = elapsed_ms(legacy_load)
+            load_ms = elapsed_ms(vectorized_load)
+            # Lần đầu đọc CSV và ghi bản chụp; lần thứ hai đọc bản chụp Feather vừa ghi
+            read_transactions()
+            snapshot_ms = elapsed_ms(read_transactions)
+            print(f"{n_rows:>9,} {apply_ms:>9.1f} {parse_ms:>15.1f} {apply_ms / parse_ms:>7.1f}x "
+                  f"{legacy_ms:>10.1f} {load_ms:>13.1f} {legacy_ms / load_ms:>7.1f}x {snapshot_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
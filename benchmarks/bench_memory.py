@@ -0,0 +1,53 @@
+"""So sánh memory_usage(deep=True) của bảng giao dịch trước và sau khi thu gọn kiểu dữ liệu.
+
+"Trước" là lược đồ cũ: 12 cột gốc của CSV (kể cả Content, cột tiền thô) + các cột
+float đã làm sạch; "sau" là kết quả clean_transactions() (LEAN_COLUMNS, category, int64).
+
+Chạy: python benchmarks/bench_memory.py
+"""
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_load import write_ledger  # noqa: E402
+from shareholder_core import (  # noqa: E402
+    COL_DATE_DATETIME, COL_MONEY_PARSE_ERROR, MONEY_COLUMNS,
+    clean_transactions, parse_csv_bytes, read_source,
+)
+
+COPIES = [10, 100, 1000]
+
+
+def legacy_frame(raw, cleaned):
+    """Dựng lại bảng theo lược đồ cũ để so sánh"""
+    mask = (
+        raw.iloc[:, [0, 1, 7, 8]].notna().all(axis=1) &
+        ~raw.iloc[:, 0].astype(str).str.startswith('-')
+    )
+    legacy = raw[mask].reset_index(drop=True)
+    for clean_col in MONEY_COLUMNS.values():
+        legacy[clean_col] = cleaned[clean_col].astype(float).to_numpy()
+    legacy[COL_MONEY_PARSE_ERROR] = cleaned[COL_MONEY_PARSE_ERROR].to_numpy()
+    legacy[COL_DATE_DATETIME] = cleaned[COL_DATE_DATETIME].to_numpy()
+    return legacy
+
+
+def main():
+    print(f"{'rows':>9} {'before MB':>10} {'after MB':>9} {'ratio':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data_shareholders.csv')
+        for copies in COPIES:
+            write_ledger(path, copies)
+            raw, _ = parse_csv_bytes(read_source(path)[0])
+            cleaned = clean_transactions(raw)
+            before = legacy_frame(raw, cleaned).memory_usage(deep=True).sum() / 2**20
+            after = cleaned.memory_usage(deep=True).sum() / 2**20
+            print(f"{len(cleaned):>9,} {before:>10.2f} {after:>9.2f} {before / after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""So sánh thời gian tạo báo cáo cho một lịch sử dài: openpyxl, xlsxwriter và CSV.
+
+Chạy: python benchmarks/bench_report.py
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shareholder_core  # noqa: E402
+from shareholder_core import (  # noqa: E402
+    COL_BANK, COL_DATE, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_TOTAL_MONEY_CLEAN,
+    create_download_data,
+)
+
+SIZES = [100, 1_000, 10_000]
+
+
+def make_history(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=n_rows, freq='D').strftime('%d/%m/%Y')
+    money = rng.integers(1, 50, n_rows) * 1_000_000
+    price = rng.uniform(9_000, 12_000, n_rows).round()
+    return pd.DataFrame({
+        COL_DATE: dates,
+        COL_TOTAL_MONEY_CLEAN: money,
+        COL_PRICE_DVDT_CLEAN: price,
+        COL_QUANTITY_DVDT_CLEAN: money / price,
+        COL_BANK: 'BIDV',
+    })
+
+
+def elapsed_ms(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'rows':>7} {'openpyxl ms':>12} {'xlsxwriter ms':>14} {'csv ms':>7}")
+    for n_rows in SIZES:
+        history = make_history(n_rows)
+        timings = []
+        for engine in ('openpyxl', 'xlsxwriter'):
+            with mock.patch.object(shareholder_core, 'excel_engine', return_value=engine):
+                timings.append(elapsed_ms(lambda: create_download_data(history, 'BENCH')))
+        timings.append(elapsed_ms(lambda: create_download_data(history, 'BENCH', 'csv')))
+        print(f"{n_rows:>7,} {timings[0]:>12.1f} {timings[1]:>14.1f} {timings[2]:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""So sánh tính XIRR cho toàn quỹ: giải từng cổ đông bằng vòng lặp Python và
+solve_xirr() giải mọi cổ đông cùng lúc (batch_returns).
+
+Chạy: python benchmarks/bench_returns.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from shareholder_core import (  # noqa: E402
+    COL_DATE_DATETIME, COL_QUANTITY_DVDT_CLEAN, COL_TOTAL_MONEY_CLEAN, COL_XIRR, DAYS_PER_YEAR,
+    XIRR_BOUNDS, batch_returns, open_ledger,
+)
+from synthetic_ledger import generate_ledger  # noqa: E402
+
+SIZES = [(10_000, 500), (100_000, 5_000)]
+PRICE = 11_000
+AS_OF = pd.Timestamp('2026-06-30')
+
+
+def scalar_xirr(history, price):
+    """Cách từng cổ đông: chia đôi khoảng (đơn giản, luôn hội tụ) trên dòng tiền của một người"""
+    years = ((AS_OF - history[COL_DATE_DATETIME]).dt.days / DAYS_PER_YEAR).to_numpy()
+    amounts = history[COL_TOTAL_MONEY_CLEAN].to_numpy(dtype=float)
+    nav = history[COL_QUANTITY_DVDT_CLEAN].sum() * price
+    lo, hi = XIRR_BOUNDS
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if nav - (amounts * (1 + mid) ** years).sum() > 0:
+            lo = mid
+        else:
+            hi = mid
+    return mid * 100
+
+
+def main():
+    print(f"{'rows':>9} {'holders':>8} {'per-holder ms':>14} {'batch ms':>9} {'speedup':>8} {'max diff %':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for n_rows, n_holders in SIZES:
+            generate_ledger('data_shareholders.csv', n_rows, n_holders)
+            ledger = open_ledger()
+            sorted_df, positions = ledger['index']
+
+            start = time.perf_counter()
+            loop = {key: scalar_xirr(sorted_df.iloc[rows], PRICE) for key, rows in positions.items()}
+            loop_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            returns = batch_returns(ledger['index'], ledger['holders'], PRICE, AS_OF)
+            batch_ms = (time.perf_counter() - start) * 1000
+
+            diff = np.max(np.abs(returns[COL_XIRR].loc[list(loop)].to_numpy() - np.array(list(loop.values()))))
+            print(f"{n_rows:>9,} {n_holders:>8,} {loop_ms:>14,.0f} {batch_ms:>9,.1f} "
+                  f"{loop_ms / batch_ms:>7.0f}x {diff:>11.2e}")
+            os.remove('data_shareholders.csv')
+            for name in os.listdir('.cache'):
+                os.remove(os.path.join('.cache', name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Thử tải dịch vụ tra cứu JSON (lookup_service.py) trên máy cục bộ.
+
+Khởi động dịch vụ trong một process riêng với file dữ liệu mẫu, rồi gửi request
+/shareholder/{id}?price= cho các ID ngẫu nhiên từ nhiều kết nối giữ-mở song song;
+in p50/p99 độ trễ và số request/giây theo từng mức song song.
+
+Chạy: python benchmarks/bench_service.py
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shareholder_core import open_ledger  # noqa: E402
+
+CONCURRENCY = [1, 16, 64]
+REQUESTS = 5000  # Số request mỗi mức song song
+MISS_RATIO = 0.1  # Tỉ lệ request hỏi ID không tồn tại (404)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, timeout=60):
+    """Chờ đến khi /health trả lời (dịch vụ đã nạp xong dữ liệu)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Dịch vụ không khởi động kịp")
+
+
+async def fetch(reader, writer, path):
+    """Gửi một GET trên kết nối giữ-mở, trả về mã HTTP"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return int(head.split(b' ', 2)[1])
+
+
+async def client(port, paths, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            status = await fetch(reader, writer, path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status not in (200, 404):
+                raise RuntimeError(f"{path}: HTTP {status}")
+    finally:
+        writer.close()
+
+
+async def run_load(port, paths, concurrency):
+    """Chia đều các đường dẫn cho `concurrency` kết nối, trả về (độ trễ ms, số giây)"""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, paths[i::concurrency], latencies) for i in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    ids = list(open_ledger(os.path.join(ROOT, 'data_shareholders.csv'))['holders'].index)
+    rng = random.Random(0)
+    paths = [
+        f"/shareholder/{'KHONGTONTAI' if rng.random() < MISS_RATIO else rng.choice(ids)}?price={rng.randrange(8000, 15000, 100)}"
+        for _ in range(REQUESTS)
+    ]
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'lookup_service.py'), '--port', str(port)],
+        cwd=ROOT, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        print(f"{'conc':>5} {'requests':>9} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for concurrency in CONCURRENCY:
+            latencies, seconds = asyncio.run(run_load(port, paths, concurrency))
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{concurrency:>5} {len(latencies):>9,} {len(latencies) / seconds:>9,.0f} {p50:>8.2f} {p99:>8.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""So sánh nhiều process cùng tải sổ giao dịch: mỗi process tự đọc (open_ledger)
+và gắn vào kho dùng chung bằng memory-map (attach_ledger).
+
+Mỗi process con tải sổ, đọc qua mọi cột (như khi tra cứu/tổng hợp), rồi báo thời
+gian tải và bộ nhớ riêng / PSS (phần bộ nhớ chia đều cho các process dùng chung)
+lấy từ /proc/self/smaps_rollup (chỉ có trên Linux).
+
+Chạy: python benchmarks/bench_store.py
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_load import write_ledger  # noqa: E402
+from ledger_store import attach_ledger, load_shared_ledger  # noqa: E402
+from shareholder_core import open_ledger  # noqa: E402
+
+COPIES = 2000
+WORKERS = 4
+
+
+def memory_kb():
+    """(bộ nhớ riêng, PSS) của process hiện tại, đơn vị KB"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return fields['Private_Clean'] + fields['Private_Dirty'], fields['Pss']
+
+
+def worker(args):
+    mode, barrier = args
+    before, _ = memory_kb()
+    start = time.perf_counter()
+    ledger = open_ledger() if mode == 'open' else attach_ledger()
+    load_ms = (time.perf_counter() - start) * 1000
+    sorted_df = ledger['index'][0]
+    for col in sorted_df.columns:
+        series = sorted_df[col]
+        values = series.cat.codes if series.dtype == 'category' else series
+        values.to_numpy().view('uint8').sum()  # đọc qua mọi byte của cột
+    # Đo khi mọi process đều đang giữ sổ để PSS phản ánh phần dùng chung
+    barrier.wait()
+    private, pss = memory_kb()
+    barrier.wait()
+    return load_ms, private - before, pss
+
+
+def run(mode, manager):
+    barrier = manager.Barrier(WORKERS)
+    with multiprocessing.get_context('spawn').Pool(WORKERS) as pool:
+        return pool.map(worker, [(mode, barrier)] * WORKERS)
+
+
+def main():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("Cần Linux (/proc/self/smaps_rollup) để đo bộ nhớ")
+        return
+    with tempfile.TemporaryDirectory() as tmp, multiprocessing.Manager() as manager:
+        os.chdir(tmp)
+        write_ledger('data_shareholders.csv', COPIES)
+        start = time.perf_counter()
+        ledger = load_shared_ledger()
+        publish_s = time.perf_counter() - start
+        print(f"{len(ledger['index'][0]):,} giao dịch, đọc CSV + công bố vào kho: {publish_s:.1f} s")
+        print(f"{'mode':>7} {'load ms':>9} {'private MB':>11} {'PSS MB':>8}  (trung bình mỗi process, {WORKERS} process)")
+        for mode in ('open', 'attach'):
+            results = run(mode, manager)
+            load_ms = sum(r[0] for r in results) / WORKERS
+            private_mb = sum(r[1] for r in results) / WORKERS / 1024
+            pss_mb = sum(r[2] for r in results) / WORKERS / 1024
+            print(f"{mode:>7} {load_ms:>9.1f} {private_mb:>11.1f} {pss_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""So sánh bộ nhớ đỉnh và thời gian: đọc toàn bộ file và đọc dạng luồng theo khối.
+
+Trước khi đo, kiểm tra đọc luồng với các khối rất nhỏ trên file mẫu (có khối chỉ gồm
+dòng chi tiết "- ...", làm sạch ra bảng rỗng) vẫn cho cùng kết quả với đọc toàn bộ.
+
+Chạy: python benchmarks/bench_streaming.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_load import write_ledger  # noqa: E402
+from shareholder_core import (  # noqa: E402
+    COL_QUANTITY_DVDT_CLEAN, COL_TOTAL_MONEY_CLEAN, clean_transactions, parse_csv_bytes, read_source,
+    stream_transactions, summarize_holders,
+)
+
+COPIES = [100, 1000]
+CHECK_CHUNK_SIZES = [1, 7, 13]  # Khối nhỏ để chắc chắn có khối không có giao dịch nào
+
+
+def full_load(path):
+    content, _ = read_source(path)
+    df, _ = parse_csv_bytes(content)
+    main_transactions = clean_transactions(df)
+    return main_transactions, summarize_holders(main_transactions)
+
+
+def check_small_chunks(path):
+    """Đọc luồng với khối nhỏ phải ra cùng số giao dịch, tổng tiền và tổng ĐVĐT như đọc toàn bộ"""
+    expected, _ = full_load(path)
+    for chunksize in CHECK_CHUNK_SIZES:
+        df, holders, _ = stream_transactions(path, chunksize)
+        assert len(df) == len(expected), (chunksize, len(df), len(expected))
+        assert df[COL_TOTAL_MONEY_CLEAN].sum() == expected[COL_TOTAL_MONEY_CLEAN].sum(), chunksize
+        assert abs(holders[COL_QUANTITY_DVDT_CLEAN].sum() - expected[COL_QUANTITY_DVDT_CLEAN].sum()) < 1e-6, chunksize
+
+
+def measure(func, *args):
+    """Trả về (thời gian ms, bộ nhớ đỉnh MB, kích thước kết quả MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    df, holders = func(*args)[:2]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    result_mb = (df.memory_usage(deep=True).sum() + holders.memory_usage(deep=True).sum()) / 2**20
+    return elapsed_ms, peak_mb, result_mb
+
+
+def main():
+    check_small_chunks(os.path.join(os.path.dirname(BENCH_DIR), 'data_shareholders.csv'))
+    print(f"{'file MB':>8} {'mode':>7} {'ms':>8} {'peak MB':>9} {'result MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data_shareholders.csv')
+        for copies in COPIES:
+            write_ledger(path, copies)
+            file_mb = os.path.getsize(path) / 2**20
+            for mode, func in (('full', full_load), ('stream', stream_transactions)):
+                elapsed_ms, peak_mb, result_mb = measure(func, path)
+                print(f"{file_mb:>8.1f} {mode:>7} {elapsed_ms:>8.0f} {peak_mb:>9.1f} {result_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""So sánh gợi ý ID gần đúng: duyệt toàn bộ ID và chỉ mục trigram, với 100k ID.
+
+ID giả lập theo đúng dạng họ tên không dấu + 6-8 số cuối STK; ID tra cứu là ID có
+thật bị gõ sai 1-2 ký tự (đổi, thiếu, thừa, đảo chỗ).
+
+Chạy: python benchmarks/bench_suggest.py
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from shareholder_core import (  # noqa: E402
+    SUGGESTION_LIMIT, SUGGESTION_MAX_DISTANCE, build_suggestion_index, edit_distance, suggest_ids,
+)
+from synthetic_ledger import FAMILY, GIVEN, MIDDLE  # noqa: E402
+
+N_IDS = 100_000
+N_QUERIES = 200
+N_SCAN_QUERIES = 5  # Duyệt toàn bộ chậm: chỉ đo vài truy vấn
+
+
+def make_ids(n, rng):
+    ids = set()
+    while len(ids) < n:
+        name = rng.choice(FAMILY) + rng.choice(MIDDLE) + rng.choice(GIVEN)
+        ids.add(name + ''.join(rng.choice('0123456789') for _ in range(rng.randint(6, 8))))
+    return sorted(ids)
+
+
+def mistype(value, rng):
+    """Gõ sai 1-2 ký tự: đổi, thiếu, thừa hoặc đảo hai ký tự liền nhau"""
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(value) - 1)
+        kind = rng.choice(['replace', 'delete', 'insert', 'swap'])
+        char = rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+        if kind == 'replace':
+            value = value[:i] + char + value[i + 1:]
+        elif kind == 'delete':
+            value = value[:i] + value[i + 1:]
+        elif kind == 'insert':
+            value = value[:i] + char + value[i:]
+        else:
+            value = value[:i] + value[i + 1] + value[i] + value[i + 2:]
+    return value
+
+
+def scan(ids, query):
+    """Cách đơn giản: tính khoảng cách tới mọi ID"""
+    scored = []
+    for value in ids:
+        distance = edit_distance(query, value, SUGGESTION_MAX_DISTANCE)
+        if distance <= SUGGESTION_MAX_DISTANCE:
+            scored.append((distance, value))
+    scored.sort()
+    return [value for _, value in scored[:SUGGESTION_LIMIT]]
+
+
+def main():
+    rng = random.Random(0)
+    ids = make_ids(N_IDS, rng)
+    targets = [rng.choice(ids) for _ in range(N_QUERIES)]
+    queries = [mistype(target, rng) for target in targets]
+
+    start = time.perf_counter()
+    index = build_suggestion_index(ids)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    timings, hits, reachable = [], 0, 0
+    for query, target in zip(queries, targets):
+        start = time.perf_counter()
+        suggestions = suggest_ids(index, query)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += target in suggestions
+        # Hai lần đảo chỗ có thể cách ID gốc hơn SUGGESTION_MAX_DISTANCE
+        reachable += edit_distance(query, target, SUGGESTION_MAX_DISTANCE) <= SUGGESTION_MAX_DISTANCE
+
+    scan_timings = []
+    for query in queries[:N_SCAN_QUERIES]:
+        start = time.perf_counter()
+        expected = scan(ids, query)
+        scan_timings.append((time.perf_counter() - start) * 1000)
+        assert suggest_ids(index, query) == expected, query
+
+    p50, p99 = np.percentile(timings, [50, 99])
+    print(f"{N_IDS:,} ID, dựng chỉ mục: {build_ms:,.0f} ms")
+    print(f"trigram: p50 {p50:.2f} ms, p99 {p99:.2f} ms, gợi ý đúng ID gốc {hits}/{reachable} "
+          f"(ID gõ sai trong ngưỡng {SUGGESTION_MAX_DISTANCE} ký tự)")
+    print(f"duyệt toàn bộ: {np.mean(scan_timings):,.0f} ms/truy vấn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Bộ benchmark các đường nóng của ứng dụng trên sổ giả lập (synthetic_ledger.py).
+
+Với mỗi cỡ sổ, đo:
+    load.cold       read_transactions() khi chưa có bản chụp (đọc + làm sạch CSV)
+    load.snapshot   read_transactions() từ bản chụp Feather
+    filter          clean_transactions(): lọc dòng giao dịch chính + làm sạch tiền/ngày
+    summary         summarize_holders() trên toàn sổ
+    validate        validate_transactions(): kiểm tra chất lượng toàn sổ
+    index           build_id_index(): sắp xếp, chỉ mục ID, lũy kế
+    lookup          lookup_summary() + lookup_shareholder() của một ID ngẫu nhiên
+    returns         batch_returns(): XIRR/TWR của mọi cổ đông ở một mức giá
+    nav             build_nav_snapshots(): NAV cuối mỗi tháng của mọi cổ đông (giá suy từ sổ)
+    chart           chart_series() + spec Vega-Lite hai biểu đồ lịch sử của cổ đông nhiều giao dịch nhất
+    export.xlsx     create_download_data() của cổ đông đó
+
+Cùng tham số (và seed) thì cùng dữ liệu, nên kết quả so sánh được giữa các phiên
+bản: ghi kết quả bằng --json rồi so với lần sau bằng --compare.
+
+Chạy: python benchmarks/bench_suite.py --rows 10000 100000 --json bench.json
+      python benchmarks/bench_suite.py --rows 10000 100000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from shareholder_core import (  # noqa: E402
+    COL_AVG_PRICE, COL_CUM_DVDT, COL_CUM_MONEY, COL_DATE_DATETIME, COL_PRICE_DVDT_CLEAN,
+    COL_QUANTITY_DVDT_CLEAN, COL_SHAREHOLDER, COL_TOTAL_MONEY_CLEAN, COL_TX_COUNT,
+    batch_returns, build_id_index, build_nav_snapshots, chart_series, clean_transactions,
+    create_download_data, ledger_price_history, lookup_shareholder, lookup_summary, parse_csv_bytes,
+    read_transactions, summarize_holders, validate_transactions,
+)
+from synthetic_ledger import generate_ledger  # noqa: E402
+
+ROWS = [10_000, 100_000]
+REPEAT = 5  # Số lần đo mỗi công đoạn
+LOOKUPS = 500  # Số ID tra cứu
+RETURNS_PRICE = 11_000  # Giá ĐVĐT khi đo batch_returns
+REGRESSION_THRESHOLD = 1.25  # Chậm hơn bản so sánh quá tỉ lệ này thì báo chậm đi
+
+
+def measure(func, repeat):
+    """Chạy `func` `repeat` lần, trả về danh sách thời gian (ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def history_chart_specs(history):
+    """Spec Vega-Lite (kèm dữ liệu đã giảm điểm) của hai biểu đồ lịch sử như trên trang tra cứu"""
+    history = chart_series(history)
+    specs = []
+    for y, title in ((COL_CUM_MONEY, 'Tổng tiền đầu tư (VNĐ)'), (COL_CUM_DVDT, 'Tổng ĐVĐT sở hữu')):
+        chart = alt.Chart(history).mark_line(point=True).encode(
+            x=alt.X(f'{COL_DATE_DATETIME}:T', title='Ngày'),
+            y=alt.Y(f'{y}:Q', title=title),
+            tooltip=[
+                alt.Tooltip(f'{COL_DATE_DATETIME}:T'),
+                alt.Tooltip(f'{COL_TOTAL_MONEY_CLEAN}:Q'),
+                alt.Tooltip(f'{COL_PRICE_DVDT_CLEAN}:Q'),
+                alt.Tooltip(f'{COL_QUANTITY_DVDT_CLEAN}:Q'),
+                alt.Tooltip(f'{y}:Q'),
+                alt.Tooltip(f'{COL_AVG_PRICE}:Q'),
+            ],
+        )
+        specs.append(chart.to_dict())
+    return specs
+
+
+def run_size(n_rows, n_holders, repeat, n_lookups, seed):
+    """Đo mọi công đoạn trên một sổ giả lập `n_rows` giao dịch, trả về {công đoạn: [ms]}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        ids = generate_ledger('data_shareholders.csv', n_rows, n_holders, seed, loose_content_ratio=0.01)
+
+        def cold_load():
+            # Xóa bản chụp để lần nào cũng đọc lại CSV
+            if os.path.exists('.cache'):
+                for name in os.listdir('.cache'):
+                    os.remove(os.path.join('.cache', name))
+            return read_transactions()
+
+        results['load.cold'] = measure(cold_load, repeat)
+        results['load.snapshot'] = measure(read_transactions, repeat)
+
+        with open('data_shareholders.csv', 'rb') as f:
+            raw, _ = parse_csv_bytes(f.read())
+        results['filter'] = measure(lambda: clean_transactions(raw), repeat)
+        df = clean_transactions(raw)
+        results['summary'] = measure(lambda: summarize_holders(df), repeat)
+        results['validate'] = measure(lambda: validate_transactions(df), repeat)
+        results['index'] = measure(lambda: build_id_index(df), repeat)
+
+        holders = summarize_holders(df)
+        id_index = build_id_index(df)
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(ids, n_lookups)
+        results['lookup'] = []
+        for shareholder_id in queries:
+            start = time.perf_counter()
+            lookup_summary(holders, shareholder_id)
+            lookup_shareholder(id_index, shareholder_id)
+            results['lookup'].append((time.perf_counter() - start) * 1000)
+
+        results['returns'] = measure(lambda: batch_returns(id_index, holders, RETURNS_PRICE), repeat)
+        prices = ledger_price_history(id_index)
+        results['nav'] = measure(lambda: build_nav_snapshots(id_index, holders, prices), repeat)
+
+        top_id = holders[COL_TX_COUNT].idxmax()
+        top_name = holders.at[top_id, COL_SHAREHOLDER]
+        results['chart'] = measure(lambda: history_chart_specs(lookup_shareholder(id_index, top_id)), repeat)
+        history = lookup_shareholder(id_index, top_id)
+        results['export.xlsx'] = measure(lambda: create_download_data(history, top_name), repeat)
+        os.chdir(ROOT)
+    return results, int(holders[COL_TX_COUNT].max())
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(timings):
+    p50, p95 = np.percentile(timings, [50, 95])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'runs': len(timings)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark các đường nóng trên sổ giao dịch giả lập.")
+    parser.add_argument('--rows', type=int, nargs='+', default=ROWS, help=f"Số giao dịch mỗi cỡ sổ (mặc định: {ROWS})")
+    parser.add_argument('--holders', type=int, help="Số cổ đông (mặc định: số giao dịch / 20)")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help=f"Số lần đo mỗi công đoạn (mặc định: {REPEAT})")
+    parser.add_argument('--lookups', type=int, default=LOOKUPS, help=f"Số ID tra cứu (mặc định: {LOOKUPS})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Ghi kết quả ra file JSON")
+    parser.add_argument('--compare', help="So với kết quả JSON của một lần chạy trước")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Tỉ lệ p50 mới / cũ bị coi là chậm đi (mặc định: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            for size in json.load(f)['sizes']:
+                baseline[size['rows']] = size['stages']
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'sizes': [],
+    }
+    regressions = 0
+    for n_rows in args.rows:
+        results, top_count = run_size(n_rows, args.holders, args.repeat, args.lookups, args.seed)
+        stages = {stage: summarize(timings) for stage, timings in results.items()}
+        report['sizes'].append({'rows': n_rows, 'holders': args.holders or n_rows // 20, 'stages': stages})
+
+        print(f"\n{n_rows:,} giao dịch (cổ đông nhiều nhất: {top_count:,} giao dịch)")
+        print(f"{'stage':<14} {'p50 ms':>10} {'p95 ms':>10}" + (f" {'so với cũ':>10}" if baseline else ''))
+        for stage, stats in stages.items():
+            line = f"{stage:<14} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}"
+            old = baseline.get(n_rows, {}).get(stage)
+            if old:
+                ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+                slower = ratio > args.threshold
+                regressions += slower
+                line += f" {ratio:>9.2f}x" + (" ⚠ chậm đi" if slower else '')
+            print(line)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    # Mã thoát khác 0 khi có công đoạn chậm đi, để dùng được trong CI
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Tạo sổ giao dịch giả lập đúng định dạng data_shareholders.csv, với số giao dịch
+và số cổ đông tùy chọn.
+
+Giữ đúng những điểm mà bộ đọc phải xử lý trong file thật: header cp1252 có ký tự
+bị mất dấu, cột tiền dạng "10,000,000" trong ngoặc kép (xen lẫn dạng số thường
+10000000 / 0.00), ngày dd/mm/yyyy, cột Content nhiều dòng trong ngoặc kép, các dòng
+chuyển tiền nội bộ / ra ngoài không có ID và các dòng trống ở cuối file. Tùy chọn
+thêm một ít Content không có ngoặc kép: các dòng "- Ngày ..." khi đó thành dòng
+riêng, đúng loại dòng mà bộ lọc trong clean_transactions() phải bỏ qua.
+
+Có thể ghi kèm file giá ĐVĐT theo ngày (nav_prices.csv) cùng chuỗi giá đã dùng cho
+các giao dịch, để thử NAV theo thời gian.
+
+Cùng `seed` luôn cho ra cùng một file, để so sánh kết quả benchmark giữa các phiên bản.
+
+Chạy: python benchmarks/synthetic_ledger.py 100000 --holders 5000 -o data_shareholders.csv --prices nav_prices.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+FAMILY = ['NGUYEN', 'TRAN', 'LE', 'PHAM', 'HOANG', 'HUYNH', 'PHAN', 'VU', 'VO', 'DANG', 'BUI', 'DO', 'HO', 'NGO', 'DUONG']
+MIDDLE = ['VAN', 'THI', 'HUU', 'DUC', 'MINH', 'NGOC', 'THANH', 'QUOC', 'XUAN', 'HONG']
+GIVEN = ['AN', 'BINH', 'CUONG', 'DUNG', 'HA', 'HAI', 'HIEU', 'HOA', 'HUNG', 'KHANH', 'LAN', 'LINH',
+         'LONG', 'MAI', 'NAM', 'PHUONG', 'QUANG', 'SON', 'TAM', 'THAO', 'TRANG', 'TUAN', 'VIET', 'YEN']
+# Ngân hàng và độ dài STK như trong file mẫu
+BANKS = [('BIDV', 10, 0.75), ('Techcombank', 14, 0.1), ('VPBank', 10, 0.05),
+         ('MSCBVNVX', 10, 0.05), ('Vietcombank', 13, 0.05)]
+
+# Header giữ nguyên các ký tự đã mất dấu ("?") của file xuất từ Excel
+HEADER = "Ngày, T?ng , Gi?m , S? d? ,Phân lo?i,Ngân hàng,STK,Shareholder,ID, Giá 1 ?V?T , S? l??ng ?V?T ,Content"
+DEPOSIT = "Chuy?n ti?n vào"
+INTERNAL = "Chuy?n ti?n n?i b?"
+WITHDRAWAL = "Chuy?n ti?n ra ngoài"
+EMPTY_ROW = ",,,,,,,,,,,"
+# Content của dòng chuyển tiền không gắn với cổ đông (giống file mẫu)
+TRANSFER_CONTENT = '"C? ?ông \n- Ngày {date}: 0,000\n- Giá 1 CCQ: 0,000\n- S? l??ng CCQ: 0,000"'
+
+START_DATE = '2025-02-28'
+START_PRICE = 10_000
+WRITE_BATCH = 50_000  # Số giao dịch ghi ra file mỗi lần
+
+
+def make_holders(n_holders, rng):
+    """Danh sách (họ tên, ngân hàng, STK, ID) không trùng ID; ID = họ tên viết liền + 6 số cuối STK"""
+    weights = np.array([bank[2] for bank in BANKS])
+    holders, seen = [], set()
+    while len(holders) < n_holders:
+        name = f"{rng.choice(FAMILY)} {rng.choice(MIDDLE)} {rng.choice(GIVEN)}"
+        bank, digits, _ = BANKS[rng.choice(len(BANKS), p=weights / weights.sum())]
+        account = str(rng.integers(1, 10)) + ''.join(map(str, rng.integers(0, 10, digits - 1)))
+        holder_id = name.replace(' ', '') + account[-6:]
+        if holder_id not in seen:
+            seen.add(holder_id)
+            holders.append((name, bank, account, holder_id))
+    return holders
+
+
+def money(value, plain):
+    """Số tiền dạng "10,000,000" trong ngoặc kép, hoặc số thường như một số dòng của file thật"""
+    return str(value) if plain else f'"{value:,}"'
+
+
+def content(holder_id, date, amount, price, units, quoted):
+    """Cột Content nhiều dòng như file mẫu"""
+    text = (
+        f"C? ?ông {holder_id}\n"
+        f"- Ngày {date}: {amount:,.0f}\n"
+        f"- Giá 1 CCQ: {price:,.0f}\n"
+        f"- S? l??ng CCQ: {units:,.0f}"
+    )
+    return f'"{text}"' if quoted else text
+
+
+def generate_ledger(path, n_transactions, n_holders=None, seed=0, days=365, plain_ratio=0.2,
+                    transfer_ratio=0.05, loose_content_ratio=0.0, trailing_rows=3, encoding='cp1252',
+                    prices_path=None):
+    """Ghi sổ giả lập ra `path`, trả về danh sách ID cổ đông (theo thứ tự tạo)
+
+    `n_transactions` là số giao dịch hợp lệ (có ID); ngoài ra còn khoảng
+    `transfer_ratio` dòng chuyển tiền không có ID, `trailing_rows` dòng trống ở cuối
+    và `loose_content_ratio` giao dịch có Content không nằm trong ngoặc kép. Có
+    `prices_path` thì ghi thêm giá ĐVĐT của mọi ngày ra file đó.
+    """
+    rng = np.random.default_rng(seed)
+    n_holders = n_holders or max(n_transactions // 20, 1)
+    holders = make_holders(min(n_holders, n_transactions), rng)
+
+    # Mỗi cổ đông có ít nhất một giao dịch; phần còn lại lệch về một số cổ đông lớn
+    weights = 1 / (np.arange(len(holders)) + 10)
+    owners = np.concatenate([
+        np.arange(len(holders)),
+        rng.choice(len(holders), n_transactions - len(holders), p=weights / weights.sum()),
+    ])
+    rng.shuffle(owners)
+    day_offsets = np.sort(rng.integers(0, days, n_transactions))
+    amounts = rng.integers(1, 11, n_transactions) * 10_000_000
+    # Giá ĐVĐT theo ngày: bước ngẫu nhiên quanh giá khởi điểm, làm tròn đến đồng
+    prices = np.round(START_PRICE * np.exp(np.cumsum(rng.normal(0, 0.005, days)))).astype(int)
+    prices[0] = START_PRICE
+    dates = np.datetime_as_string(np.datetime64(START_DATE) + np.arange(days), unit='D')
+    dates = np.array([f"{value[8:10]}/{value[5:7]}/{value[:4]}" for value in dates])
+    plain = rng.random(n_transactions) < plain_ratio
+    transfers = rng.random(n_transactions) < transfer_ratio
+    loose = rng.random(n_transactions) < loose_content_ratio
+
+    balance = 0
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(HEADER + '\n')
+        lines = []
+        for i in range(n_transactions):
+            name, bank, account, holder_id = holders[owners[i]]
+            date, price, amount = dates[day_offsets[i]], prices[day_offsets[i]], int(amounts[i])
+            units = amount / price
+            balance += amount
+            units_text = (
+                (str(int(units)) if plain[i] else f'"{units:,.0f}"') if units == int(units) else f"{units:.10g}"
+            )
+            lines.append(','.join([
+                date, money(amount, plain[i]), '0.00' if plain[i] else '0', money(balance, plain[i]),
+                DEPOSIT, bank, account, name, holder_id, money(price, plain[i]), units_text,
+                content(holder_id, date, amount, price, units, quoted=not loose[i]),
+            ]))
+            if transfers[i]:
+                # Chuyển tiền nội bộ / ra ngoài: không có thông tin cổ đông, bị bộ lọc bỏ qua
+                transfer = int(rng.integers(1, 21)) * 10_000_000
+                kind = WITHDRAWAL if rng.random() < 0.1 else INTERNAL
+                balance = max(balance - transfer, 0)
+                lines.append(','.join([
+                    date, '0', str(transfer), '0', kind, '', '', '', '', '', '',
+                    TRANSFER_CONTENT.format(date=date),
+                ]))
+            if len(lines) >= WRITE_BATCH:
+                f.write('\n'.join(lines) + '\n')
+                lines = []
+        lines.extend([EMPTY_ROW] * trailing_rows)
+        if lines:
+            f.write('\n'.join(lines) + '\n')
+    if prices_path:
+        with open(prices_path, 'w', encoding=encoding, newline='') as f:
+            f.write("Ngày,Giá 1 ?V?T\n")
+            f.writelines(f'{date},"{price:,}"\n' for date, price in zip(dates, prices))
+    return [holder[3] for holder in holders]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tạo sổ giao dịch giả lập cùng định dạng data_shareholders.csv.")
+    parser.add_argument('transactions', type=int, help="Số giao dịch hợp lệ (có ID cổ đông)")
+    parser.add_argument('--holders', type=int, help="Số cổ đông (mặc định: số giao dịch / 20)")
+    parser.add_argument('--days', type=int, default=365, help="Số ngày trải giao dịch (mặc định: 365)")
+    parser.add_argument('--seed', type=int, default=0, help="Hạt giống ngẫu nhiên (mặc định: 0)")
+    parser.add_argument('--loose-content', type=float, default=0.0,
+                        help="Tỉ lệ giao dịch có Content không nằm trong ngoặc kép (mặc định: 0)")
+    parser.add_argument('--encoding', default='cp1252', help="Encoding của file (mặc định: cp1252 như file mẫu)")
+    parser.add_argument('-o', '--output', default='data_shareholders.csv', help="File CSV ghi ra")
+    parser.add_argument('--prices', help="Ghi kèm file giá ĐVĐT theo ngày (vd. nav_prices.csv)")
+    args = parser.parse_args(argv)
+
+    if os.path.abspath(args.output) == os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data_shareholders.csv')):
+        print("Không ghi đè file dữ liệu thật, hãy chọn file khác bằng -o", file=sys.stderr)
+        return 1
+    ids = generate_ledger(args.output, args.transactions, args.holders, args.seed, args.days,
+                          loose_content_ratio=args.loose_content, encoding=args.encoding, prices_path=args.prices)
+    print(f"Đã ghi {args.output}: {args.transactions:,} giao dịch, {len(ids):,} cổ đông", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Kho sổ giao dịch dùng chung giữa các process trên cùng máy.
+
+`@st.cache_data`/`@st.cache_resource` chỉ sống trong một process: mỗi worker
+Streamlit (hoặc dịch vụ tra cứu) tự đọc CSV và giữ một bản riêng. Kho này lưu sổ
+đã làm sạch + chỉ mục ID thành các file NumPy không nén trong một thư mục theo
+phiên bản; các process gắn vào bằng memory-map nên cùng dùng một bản trong page
+cache của hệ điều hành, không sao chép.
+
+    .cache/store/CURRENT            phiên bản đang dùng
+    .cache/store/<phiên bản>/       meta.json + mỗi cột một file .npy
+
+Phiên bản mới được ghi vào thư mục tạm, đổi tên thành thư mục chính thức rồi mới
+thay CURRENT (đều bằng os.replace) nên process khác không bao giờ thấy bản dở dang.
+"""
+import contextlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+import perf_metrics
+from shareholder_core import (
+    COL_ID, DATA_FILE, SNAPSHOT_SCHEMA_VERSION, open_ledger, signature_matches,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: bỏ qua khóa liên process
+    fcntl = None
+
+STORE_DIR = os.path.join(".cache", "store")
+STORE_KEEP_VERSIONS = 2  # Số phiên bản giữ lại trên đĩa (process cũ có thể còn đang đọc)
+
+
+def ledger_version(ledger):
+    """Mã phiên bản của sổ: phiên bản cách làm sạch + hash phần file đã nạp"""
+    return f"{SNAPSHOT_SCHEMA_VERSION}-{ledger['sha256'][:20]}"
+
+
+def store_version(store_dir=STORE_DIR):
+    """Phiên bản đang được công bố trong kho, hoặc None"""
+    try:
+        with open(os.path.join(store_dir, 'CURRENT'), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+@contextlib.contextmanager
+def store_lock(store_dir=STORE_DIR):
+    """Khóa file để chỉ một process đọc CSV và công bố phiên bản mới tại một thời điểm"""
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, '.lock'), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_frame(df, directory, name):
+    """Ghi mỗi cột một file .npy; cột category lưu mã số, danh mục để trong meta"""
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        spec = {'name': col}
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            series = series.astype('category')
+            spec['categories'] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(directory, f"{name}.{i}.npy"), values, allow_pickle=False)
+        columns.append(spec)
+    return columns
+
+
+def map_array(path):
+    """Mở file .npy bằng memory-map, trả về ndarray thường (chỉ đọc) trỏ vào vùng đã map"""
+    return np.load(path, mmap_mode='r').view(np.ndarray)
+
+
+def attach_frame(directory, name, columns, index=None):
+    """Dựng DataFrame từ các file .npy bằng memory-map (không sao chép dữ liệu)"""
+    data = {}
+    for i, spec in enumerate(columns):
+        values = map_array(os.path.join(directory, f"{name}.{i}.npy"))
+        if 'categories' in spec:
+            values = pd.Categorical.from_codes(values, categories=spec['categories'], validate=False)
+        data[spec['name']] = values
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def prune_versions(store_dir, current):
+    """Xóa các phiên bản cũ, giữ lại STORE_KEEP_VERSIONS bản mới nhất"""
+    versions = [
+        entry for entry in os.scandir(store_dir)
+        if entry.is_dir() and not entry.name.endswith('.tmp') and entry.name != current
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    # Trên POSIX, process đang memory-map bản bị xóa vẫn đọc được đến khi đóng
+    for entry in versions[STORE_KEEP_VERSIONS - 1:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+@perf_metrics.timed('store.publish')
+def publish_ledger(ledger, source_path=DATA_FILE, store_dir=STORE_DIR):
+    """Ghi sổ vào kho (nếu phiên bản này chưa có) và công bố nó là bản hiện tại"""
+    version = ledger_version(ledger)
+    target = os.path.join(store_dir, version)
+    if not os.path.isdir(target):
+        tmp_dir = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        sorted_df, positions = ledger['index']
+        keys = list(positions)
+        # Vị trí theo ID dạng CSR: các dòng của ID thứ i nằm ở order[offsets[i]:offsets[i + 1]]
+        order = np.concatenate([positions[key] for key in keys]) if keys else np.empty(0, dtype=np.intp)
+        offsets = np.cumsum([0] + [len(positions[key]) for key in keys])
+        np.save(os.path.join(tmp_dir, 'positions.order.npy'), order.astype(np.intp))
+        np.save(os.path.join(tmp_dir, 'positions.offsets.npy'), offsets)
+        stat = os.stat(source_path)
+        meta = {
+            'version': version,
+            'signature': {
+                'schema': SNAPSHOT_SCHEMA_VERSION,
+                'size': ledger['offset'],
+                # mtime chỉ có nghĩa khi file chưa bị ghi thêm sau lần nạp cuối
+                'mtime_ns': stat.st_mtime_ns if stat.st_size == ledger['offset'] else None,
+                'sha256': ledger['sha256'],
+                'decode': ledger['decode'],
+            },
+            'index': save_frame(sorted_df, tmp_dir, 'index'),
+            'holders': save_frame(ledger['holders'], tmp_dir, 'holders'),
+            'holder_keys': ledger['holders'].index.tolist(),
+            'position_keys': keys,
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        try:
+            os.replace(tmp_dir, target)
+        except OSError:
+            # Process khác đã công bố cùng phiên bản
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    current_tmp = os.path.join(store_dir, f"CURRENT.{os.getpid()}.tmp")
+    with open(current_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(store_dir, 'CURRENT'))
+    prune_versions(store_dir, version)
+    return version
+
+
+@perf_metrics.timed('store.attach')
+def attach_ledger(source_path=DATA_FILE, store_dir=STORE_DIR):
+    """Gắn vào phiên bản hiện tại của kho nếu còn khớp file nguồn, ngược lại trả về None"""
+    version = store_version(store_dir)
+    if version is None:
+        return None
+    directory = os.path.join(store_dir, version)
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        signature = meta['signature']
+        if not signature_matches(signature, source_path):
+            return None
+        sorted_df = attach_frame(directory, 'index', meta['index'])
+        holders = attach_frame(directory, 'holders', meta['holders'], pd.Index(meta['holder_keys'], name=COL_ID))
+        order = map_array(os.path.join(directory, 'positions.order.npy'))
+        offsets = np.load(os.path.join(directory, 'positions.offsets.npy'))
+    except (OSError, ValueError, KeyError):
+        # Phiên bản vừa bị xóa hoặc chưa ghi xong: coi như chưa có
+        return None
+    positions = {
+        key: order[offsets[i]:offsets[i + 1]]
+        for i, key in enumerate(meta['position_keys'])
+    }
+    return {
+        'index': (sorted_df, positions),
+        'holders': holders,
+        'offset': signature['size'],
+        'sha256': signature['sha256'],
+        'decode': signature['decode'],
+        'lock': threading.Lock(),
+        'version': version,
+    }
+
+
+def load_shared_ledger(source_path=DATA_FILE, store_dir=STORE_DIR):
+    """Sổ giao dịch từ kho dùng chung; chỉ process đầu tiên (hoặc sau khi CSV đổi) đọc CSV
+
+    Báo LedgerError nếu phải đọc CSV mà không đọc được. Nếu không ghi được kho
+    (vd. thư mục chỉ đọc) thì dùng bản riêng trong process như trước.
+    """
+    ledger = attach_ledger(source_path, store_dir)
+    if ledger is not None:
+        return ledger
+    try:
+        with store_lock(store_dir):
+            # Process khác có thể vừa công bố xong trong lúc chờ khóa
+            ledger = attach_ledger(source_path, store_dir)
+            if ledger is not None:
+                return ledger
+            ledger = open_ledger(source_path)
+            publish_ledger(ledger, source_path, store_dir)
+    except OSError:
+        if ledger is None:
+            ledger = open_ledger(source_path)
+        ledger['version'] = None
+        return ledger
+    # Đọc lại từ kho để bỏ bản riêng vừa dựng, dùng chung bản memory-map với process khác
+    return attach_ledger(source_path, store_dir) or dict(ledger, version=ledger_version(ledger))
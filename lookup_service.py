@@ -0,0 +1,266 @@
+"""Dịch vụ tra cứu cổ đông dạng JSON qua HTTP (asyncio, không cần Streamlit).
+
+    GET /shareholder/{id}?price=11500&history=0&returns=1
+    GET /health       phiên bản dữ liệu, số dòng có vấn đề theo từng mục kiểm tra
+    GET /metrics      thời gian từng công đoạn (khi chạy với --metrics)
+
+Trả về cùng tổng tiền, tổng ĐVĐT, NAV/lãi lỗ/hiệu suất (kèm XIRR/TWR khi có
+returns=1) và lịch sử giao dịch như trang tra cứu; ID không tồn tại nhận 404 kèm
+gợi ý ID gần đúng (đã che số tài khoản). Sổ giao dịch được nạp một lần và dùng
+chung cho mọi request; file CSV được kiểm tra định kỳ, khi thay đổi thì nạp lại
+trong thread riêng rồi mới thay sổ mới vào (request đang xử lý vẫn đọc bản cũ,
+không bị chặn).
+
+Chạy:
+    python lookup_service.py --port 8080
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import perf_metrics
+from shareholder_core import (
+    DATA_FILE, DEFAULT_PRICE, LedgerError,
+    build_suggestion_index, fund_returns, ledger_issues, mask_id, normalize_id, refresh_ledger,
+    shareholder_record, suggest_ids,
+)
+from ledger_store import attach_ledger, load_shared_ledger, publish_ledger
+
+RELOAD_INTERVAL = 2.0  # Số giây giữa hai lần kiểm tra file CSV
+MAX_HEADER_BYTES = 16 * 1024  # Giới hạn phần header của một request
+HTTP_STATUS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    503: 'Service Unavailable',
+}
+
+
+def source_stat(source_path):
+    """Kích thước + mtime của file nguồn, dùng để phát hiện file đã thay đổi"""
+    stat = os.stat(source_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def wants_returns(query):
+    """Request có hỏi kèm XIRR/TWR (returns=1) không"""
+    return query.get('returns', ['0'])[0].lower() in ('1', 'true', 'yes')
+
+
+def encode_response(status, payload, keep_alive=True):
+    """Đóng gói một response HTTP/1.1 với thân JSON"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode('latin-1') + body
+
+
+class LookupService:
+    """Sổ giao dịch dùng chung + xử lý request; sổ chỉ được thay nguyên khối khi nạp lại"""
+
+    def __init__(self, source_path=DATA_FILE, reload_interval=RELOAD_INTERVAL):
+        self.source_path = source_path
+        self.reload_interval = reload_interval
+        self.ledger = None
+        self.stat = None
+        self.loaded_at = None
+
+    def open(self):
+        """Sổ giao dịch từ kho dùng chung (chỉ đọc CSV khi kho chưa có) kèm chỉ mục gợi ý ID"""
+        ledger = load_shared_ledger(self.source_path)
+        ledger['suggestions'] = build_suggestion_index(ledger['holders'].index)
+        self.prepare(ledger)
+        return ledger
+
+    def prepare(self, ledger):
+        """Tính sẵn khi nạp (trong thread): kiểm tra dữ liệu cho /health, XIRR/TWR ở giá mặc định"""
+        ledger_issues(ledger)
+        fund_returns(ledger, DEFAULT_PRICE)
+
+    async def load(self):
+        """Nạp sổ giao dịch lần đầu (trong thread, không chặn event loop)"""
+        stat = source_stat(self.source_path)
+        self.ledger = await asyncio.to_thread(self.open)
+        self.stat, self.loaded_at = stat, time.time()
+
+    def reload(self):
+        """Dựng sổ mới từ file CSV đã đổi (chạy trong thread)
+
+        Dùng luôn phiên bản trong kho nếu process khác đã công bố; nếu không thì
+        nạp phần ghi nối vào cuối file trên một bản sao của sổ rồi công bố, hoặc
+        đọc lại toàn bộ khi phần cũ đã bị sửa.
+        """
+        ledger = attach_ledger(self.source_path)
+        if ledger is None:
+            ledger = dict(self.ledger)
+            with perf_metrics.timed('load.refresh'):
+                added = refresh_ledger(ledger, self.source_path)
+            if added is None:
+                return self.open()
+            if added:
+                publish_ledger(ledger, self.source_path)
+        ledger['suggestions'] = build_suggestion_index(ledger['holders'].index)
+        self.prepare(ledger)
+        return ledger
+
+    async def watch(self):
+        """Kiểm tra file CSV định kỳ, nạp lại khi kích thước hoặc mtime thay đổi"""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                stat = source_stat(self.source_path)
+                if stat == self.stat:
+                    continue
+                ledger = await asyncio.to_thread(self.reload)
+            except (OSError, LedgerError) as e:
+                # Giữ sổ cũ, thử lại ở lần kiểm tra sau
+                print(f"Không nạp lại được {self.source_path}: {e}", file=sys.stderr)
+                continue
+            # Gán một lần: request sau thấy toàn bộ sổ mới, request trước vẫn giữ sổ cũ
+            self.ledger, self.stat, self.loaded_at = ledger, stat, time.time()
+            print(f"Đã nạp lại {self.source_path}: {len(ledger['holders'])} cổ đông", file=sys.stderr)
+
+    @perf_metrics.timed('service.request')
+    def respond(self, method, target):
+        """Xử lý một request, trả về (mã HTTP, dữ liệu JSON)"""
+        if method != 'GET':
+            return 405, {'error': "Chỉ hỗ trợ GET"}
+        ledger = self.ledger
+        if ledger is None:
+            return 503, {'error': "Dữ liệu đang được tải"}
+        url = urlsplit(target)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+
+        if path == '/metrics':
+            return 200, perf_metrics.snapshot()
+
+        if path == '/health':
+            return 200, {
+                'status': 'ok',
+                'sha256': ledger['sha256'],
+                'holders': len(ledger['holders']),
+                'transactions': len(ledger['index'][0]),
+                'issues': ledger_issues(ledger)['counts'],
+                'loaded_at': self.loaded_at,
+            }
+
+        prefix = '/shareholder/'
+        if not path.startswith(prefix) or not path[len(prefix):].strip():
+            return 404, {'error': "Không tìm thấy đường dẫn"}
+        shareholder_id = path[len(prefix):]
+        try:
+            price = float(query.get('price', [DEFAULT_PRICE])[0])
+        except ValueError:
+            return 400, {'error': "Giá ĐVĐT không hợp lệ"}
+        # float() nhận cả "inf"/"nan", không ghi được ra JSON hợp lệ
+        if not math.isfinite(price) or price < 0:
+            return 400, {'error': "Giá ĐVĐT không hợp lệ"}
+        include_history = query.get('history', ['1'])[0].lower() not in ('0', 'false', 'no')
+        # XIRR/TWR tính cho cả quỹ một lần mỗi mức giá, nên chỉ kèm khi được hỏi
+        include_returns = wants_returns(query)
+
+        record = shareholder_record(ledger, shareholder_id, price, include_history, include_returns)
+        if record is None:
+            # Chỉ gợi ý ID đã che số tài khoản, không trả thông tin của cổ đông khác
+            suggestions = suggest_ids(ledger['suggestions'], shareholder_id)
+            return 404, {
+                'id': normalize_id(shareholder_id),
+                'found': False,
+                'suggestions': [mask_id(value) for value in suggestions],
+            }
+        return 200, record
+
+    async def dispatch(self, method, target):
+        """Gọi respond(); request có returns=1 chạy trong thread vì mỗi mức giá mới phải giải
+        XIRR cho cả quỹ, không để các kết nối khác phải chờ"""
+        if wants_returns(parse_qs(urlsplit(target).query)):
+            return await asyncio.to_thread(self.respond, method, target)
+        return self.respond(method, target)
+
+    async def handle(self, reader, writer):
+        """Một kết nối HTTP/1.1 (giữ kết nối cho nhiều request liên tiếp)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                # Bỏ qua thân request (nếu có) để đọc đúng request tiếp theo
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                parts = request_line.split(' ')
+                if len(parts) == 3:
+                    method, target, version = parts
+                    status, payload = await self.dispatch(method, target)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                else:
+                    status, payload, keep_alive = 400, {'error': "Request không hợp lệ"}, False
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080, ready=None):
+        """Nạp dữ liệu, mở cổng và theo dõi file CSV cho đến khi bị dừng"""
+        await self.load()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        watcher = asyncio.create_task(self.watch())
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dịch vụ tra cứu cổ đông dạng JSON qua HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="Địa chỉ lắng nghe (mặc định: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Cổng (mặc định: 8080)")
+    parser.add_argument('--source', default=DATA_FILE, help=f"File CSV nguồn (mặc định: {DATA_FILE})")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help=f"Số giây giữa hai lần kiểm tra file CSV (mặc định: {RELOAD_INTERVAL})")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Đo thời gian từng công đoạn, xem tại GET /metrics")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        perf_metrics.enable()
+
+    service = LookupService(args.source, args.reload_interval)
+    print(f"Đang phục vụ tại http://{args.host}:{args.port}/shareholder/{{id}}", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except LedgerError as e:
+        print(f"Lỗi: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
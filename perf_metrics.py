@@ -0,0 +1,122 @@
+"""Đo thời gian từng công đoạn (đọc CSV, làm sạch, tra cứu, tạo báo cáo, vẽ biểu đồ...)
+và đếm trúng/trượt bộ nhớ đệm. Mặc định tắt.
+
+Bật bằng biến môi trường SHAREHOLDER_METRICS=1 (hoặc gọi enable()). Khi tắt,
+timed() chỉ tốn một lần kiểm tra cờ. Đặt thêm SHAREHOLDER_METRICS_LOG=<file> để ghi
+mỗi lần đo thành một dòng JSON; snapshot() trả về số liệu tổng hợp dạng dict.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+METRICS_ENV = "SHAREHOLDER_METRICS"
+METRICS_LOG_ENV = "SHAREHOLDER_METRICS_LOG"
+METRICS_WINDOW = 1000  # Số lần đo gần nhất giữ lại cho mỗi công đoạn (để tính p50/p95)
+
+_enabled = os.environ.get(METRICS_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+_log_path = os.environ.get(METRICS_LOG_ENV) or None
+_lock = threading.Lock()
+_samples = {}  # công đoạn -> các lần đo gần nhất (ms)
+_counts = collections.Counter()  # công đoạn -> tổng số lần đo
+_totals = collections.Counter()  # công đoạn -> tổng thời gian (ms)
+_counters = collections.Counter()  # bộ đếm khác (vd. cache.ledger.hit)
+
+
+def enable(flag=True, log_path=None):
+    """Bật/tắt việc đo (vd. từ tham số dòng lệnh); `log_path` thay cho SHAREHOLDER_METRICS_LOG"""
+    global _enabled, _log_path
+    _enabled = flag
+    if log_path is not None:
+        _log_path = log_path
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    """Xóa toàn bộ số liệu đã đo"""
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+def record(stage, elapsed_ms):
+    """Ghi một lần đo của công đoạn `stage`"""
+    with _lock:
+        _samples.setdefault(stage, collections.deque(maxlen=METRICS_WINDOW)).append(elapsed_ms)
+        _counts[stage] += 1
+        _totals[stage] += elapsed_ms
+        if _log_path:
+            with open(_log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'ts': time.time(), 'pid': os.getpid(), 'stage': stage, 'ms': round(elapsed_ms, 3),
+                }) + '\n')
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """Đo thời gian khối lệnh bên trong (kể cả khi khối lệnh báo lỗi); dùng được làm decorator"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000)
+
+
+def count(name, n=1):
+    """Tăng bộ đếm `name`"""
+    if _enabled:
+        with _lock:
+            _counters[name] += n
+
+
+def counter(name):
+    return _counters[name]
+
+
+def cache_event(cache, hit):
+    """Ghi một lần trúng/trượt của bộ nhớ đệm `cache`"""
+    count(f"cache.{cache}.{'hit' if hit else 'miss'}")
+
+
+def snapshot():
+    """Số liệu tổng hợp: mỗi công đoạn (số lần, tổng, p50/p95/max) và tỉ lệ trúng cache"""
+    with _lock:
+        samples = {stage: np.array(values) for stage, values in _samples.items()}
+        counts, totals, counters = dict(_counts), dict(_totals), dict(_counters)
+
+    stages = {}
+    for stage in sorted(samples):
+        p50, p95 = np.percentile(samples[stage], [50, 95])
+        stages[stage] = {
+            'count': counts[stage],
+            'total_ms': round(totals[stage], 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'max_ms': round(float(samples[stage].max()), 3),
+        }
+
+    caches = {}
+    for name in sorted({key[len('cache.'):].rsplit('.', 1)[0] for key in counters if key.startswith('cache.')}):
+        hit, miss = counters.get(f"cache.{name}.hit", 0), counters.get(f"cache.{name}.miss", 0)
+        caches[name] = {'hit': hit, 'miss': miss, 'hit_rate': round(hit / (hit + miss), 4) if hit + miss else None}
+
+    return {
+        'enabled': _enabled,
+        'pid': os.getpid(),
+        'window': METRICS_WINDOW,
+        'stages': stages,
+        'caches': caches,
+        'counters': {key: value for key, value in sorted(counters.items()) if not key.startswith('cache.')},
+    }
@@ -0,0 +1,1362 @@
+"""Lõi tra cứu cổ đông dùng chung, không phụ thuộc Streamlit.
+
+Đọc/làm sạch sổ giao dịch, chỉ mục ID, bảng tổng hợp theo cổ đông, NAV và báo cáo.
+Giao diện (streamlit_app.py), xuất hàng loạt (batch_export.py) và các script đều
+dùng chung module này; lỗi được báo bằng LedgerError thay vì hiển thị trực tiếp.
+
+Chạy dạng dòng lệnh: mỗi dòng stdin là một ID, mỗi dòng stdout là một JSON
+
+    echo VUTHIHONGLE105097 | python shareholder_core.py --price 10000
+"""
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import argparse
+import io
+import os
+import json
+import hashlib
+import sys
+import threading
+import time
+import codecs
+from collections import OrderedDict
+
+import perf_metrics
+
+# ======================== CONSTANTS ========================
+# Định nghĩa hằng số cho các tên cột
+COL_DATE = "Ngày"
+COL_TOTAL_MONEY = " Tổng "  # Note: has leading and trailing spaces
+COL_DECREASE = " Giảm "  # Note: has leading and trailing spaces
+COL_BALANCE = " Số dư "  # Note: has leading and trailing spaces
+COL_CATEGORY = "Phân loại"
+COL_BANK = "Ngân hàng"
+COL_ACCOUNT = "STK"
+COL_SHAREHOLDER = "Shareholder"
+COL_ID = "ID"
+COL_PRICE_DVDT = " Giá 1 ĐVĐT "  # Note: has leading and trailing spaces
+COL_QUANTITY_DVDT = " Số lượng ĐVĐT "  # Note: has leading and trailing spaces
+COL_CONTENT = "Content"
+
+# Tên cột sau khi làm sạch
+COL_TOTAL_MONEY_CLEAN = "Tổng_tiền_clean"
+COL_PRICE_DVDT_CLEAN = "Giá_ĐVĐT_clean"
+COL_QUANTITY_DVDT_CLEAN = "Số_lượng_ĐVĐT_clean"
+COL_DATE_DATETIME = "Ngày_datetime"
+COL_MONEY_PARSE_ERROR = "Lỗi_tiền_tệ"
+COL_ACCOUNT_MISMATCH = "Lỗi_ID_STK"  # ID không kết thúc bằng các số cuối của STK
+
+# Tên cột của bảng tổng hợp theo cổ đông
+COL_TX_COUNT = "Số_giao_dịch"
+COL_FIRST_DATE = "Ngày_đầu_tiên"
+COL_LAST_DATE = "Ngày_gần_nhất"
+
+# Cột lũy kế theo từng cổ đông (tính sẵn khi dựng chỉ mục)
+COL_CUM_MONEY = "Tích_lũy_tiền"
+COL_CUM_DVDT = "Tích_lũy_ĐVĐT"
+COL_AVG_PRICE = "Giá_mua_trung_bình"
+RUNNING_COLUMNS = [COL_CUM_MONEY, COL_CUM_DVDT, COL_AVG_PRICE]
+
+# Dữ liệu biểu đồ lịch sử: chỉ các cột được vẽ/hiện trong tooltip
+CHART_COLUMNS = [
+    COL_DATE_DATETIME, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN,
+    COL_CUM_MONEY, COL_CUM_DVDT, COL_AVG_PRICE,
+]
+CHART_MAX_POINTS = 400  # Số điểm tối đa mỗi biểu đồ, giới hạn dữ liệu gửi lên trình duyệt
+
+# Chỉ số của bảng NAV theo mức giá (cột cấp 1 của kết quả batch_nav)
+COL_NAV = "NAV"
+COL_PNL = "Lãi_lỗ"
+COL_PERFORMANCE = "Hiệu_suất"
+NAV_METRICS = [COL_NAV, COL_PNL, COL_PERFORMANCE]
+WHATIF_PRICE_STEP = 100  # Bước giá của thanh trượt What-if (VNĐ)
+
+# Lợi suất theo dòng tiền (XIRR) và theo thời gian (TWR), đơn vị % như Hiệu_suất
+COL_XIRR = "XIRR"
+COL_TWR = "TWR"
+COL_TWR_ANNUAL = "TWR_năm"
+RETURN_METRICS = [COL_XIRR, COL_TWR, COL_TWR_ANNUAL]
+DAYS_PER_YEAR = 365.0
+XIRR_BOUNDS = (-0.9999, 1000.0)  # Khoảng tìm nghiệm XIRR (tỉ lệ/năm)
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 100
+RETURNS_CACHE_ENTRIES = 32  # Số mức giá giữ bảng lợi suất trong bộ nhớ đệm của mỗi sổ
+
+# NAV theo thời gian: giá ĐVĐT lịch sử ghép với số ĐVĐT lũy kế tại cuối mỗi kỳ
+COL_PERIOD_END = "Cuối_kỳ"
+COL_NAV_PRICE = "Giá_ĐVĐT_định_giá"
+NAV_SNAPSHOT_FREQ = 'M'  # Độ dài kỳ chốt NAV (pandas Period): tháng
+DEFAULT_PRICE = 10000.0  # Giá ĐVĐT mặc định khi người dùng chưa nhập
+
+# Gợi ý ID gần đúng khi tra cứu không thấy
+SUGGESTION_LIMIT = 5  # Số gợi ý tối đa
+SUGGESTION_MAX_DISTANCE = 2  # Khoảng cách sửa (Levenshtein) tối đa so với ID đã nhập
+SUGGESTION_MIN_LENGTH = 6  # ID nhập ngắn hơn thì không gợi ý (tránh liệt kê ID của người khác)
+SUGGESTION_CANDIDATES = 200  # Số ứng viên nhiều trigram chung nhất được tính khoảng cách
+
+# Định dạng báo cáo tải xuống: nhãn -> (đuôi file, MIME)
+REPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+}
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Tổng dung lượng báo cáo giữ trong bộ nhớ đệm
+
+# File dữ liệu nguồn và bản chụp dạng cột (Feather) đã làm sạch
+DATA_FILE = "data_shareholders.csv"
+PRICE_FILE = "nav_prices.csv"  # Giá ĐVĐT theo ngày (tùy chọn): cột 1 ngày dd/mm/yyyy, cột 2 giá
+SNAPSHOT_FILE = os.path.join(".cache", "data_shareholders.feather")
+SNAPSHOT_SCHEMA_VERSION = 6  # Tăng khi thay đổi cách làm sạch dữ liệu
+ENCODING_SAMPLE_SIZE = 64 * 1024  # Số byte đầu file dùng để đoán encoding
+
+# File lớn hơn ngưỡng này được đọc theo từng khối để giới hạn bộ nhớ
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+CHUNK_SIZE = 100_000  # Số dòng CSV mỗi khối khi đọc dạng luồng
+
+# Tên chuẩn của các cột trong file CSV, theo thứ tự (header gốc thường bị mất dấu)
+RAW_COLUMNS = [
+    COL_DATE, COL_TOTAL_MONEY, COL_DECREASE, COL_BALANCE, COL_CATEGORY,
+    COL_BANK, COL_ACCOUNT, COL_SHAREHOLDER, COL_ID,
+    COL_PRICE_DVDT, COL_QUANTITY_DVDT, COL_CONTENT,
+]
+
+# STK đọc dạng chuỗi: đọc thành số thì số tài khoản từ 16 chữ số trở lên bị làm tròn
+RAW_DTYPES = {RAW_COLUMNS.index(COL_ACCOUNT): str}
+
+# Cột tiền tệ gốc -> cột số sau khi làm sạch
+MONEY_COLUMNS = {
+    COL_TOTAL_MONEY: COL_TOTAL_MONEY_CLEAN,
+    COL_PRICE_DVDT: COL_PRICE_DVDT_CLEAN,
+    COL_QUANTITY_DVDT: COL_QUANTITY_DVDT_CLEAN,
+}
+
+# Các cột giữ lại sau khi làm sạch (bỏ Content và các cột tiền thô)
+LEAN_COLUMNS = [
+    COL_DATE, COL_BANK, COL_SHAREHOLDER, COL_ID,
+    COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN,
+    COL_DATE_DATETIME, COL_MONEY_PARSE_ERROR, COL_ACCOUNT_MISMATCH,
+]
+
+# Cột văn bản lặp lại nhiều lần -> lưu dạng category
+CATEGORY_COLUMNS = [COL_DATE, COL_BANK, COL_SHAREHOLDER, COL_ID]
+
+# Cách gộp bảng tổng hợp theo cổ đông (dùng khi gộp nhiều khối / phần dữ liệu mới)
+HOLDER_AGGREGATIONS = {
+    COL_SHAREHOLDER: 'first',
+    COL_TOTAL_MONEY_CLEAN: 'sum',
+    COL_QUANTITY_DVDT_CLEAN: 'sum',
+    COL_TX_COUNT: 'sum',
+    COL_FIRST_DATE: 'min',
+    COL_LAST_DATE: 'max',
+}
+
+# Kiểm tra chất lượng dữ liệu (validate_transactions): mã -> mô tả
+ISSUE_CHECKS = {
+    'money': "Số tiền không đọc được (đã tính là 0)",
+    'date': "Ngày không hợp lệ",
+    'duplicate': "Nghi trùng (cùng ngày, ID, số tiền, giá, số lượng)",
+    'amount': "Tổng tiền ≠ giá × số lượng ĐVĐT",
+    'account': "ID không khớp số cuối STK",
+}
+ID_ACCOUNT_DIGITS = 6  # ID = họ tên không dấu + ít nhất 6 số cuối STK
+# Số lượng ĐVĐT được làm tròn nên tổng tiền được lệch giá × số lượng tối đa chừng này ĐVĐT
+AMOUNT_TOLERANCE_DVDT = 1.0
+# Hai dòng trùng tất cả các cột này được coi là một giao dịch bị ghi hai lần
+DUPLICATE_COLUMNS = [COL_DATE, COL_ID, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN]
+ISSUE_REPORT_COLUMNS = [
+    COL_DATE, COL_ID, COL_SHAREHOLDER, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN,
+]
+
+class LedgerError(Exception):
+    """Lỗi khi đọc/làm sạch sổ giao dịch, kèm gợi ý cách khắc phục (nếu có)"""
+    def __init__(self, message, hint=None):
+        super().__init__(message)
+        self.hint = hint
+
+def parse_money(series):
+    """Chuyển cột tiền tệ sang số (vector hóa), trả về (giá trị, mặt nạ dòng lỗi)"""
+    # Cột đã được read_csv(thousands=',') đọc thành số thì không cần xử lý chuỗi
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.astype(float)
+        return values.fillna(0), pd.Series(False, index=series.index)
+    cleaned = series.astype(str).str.replace(r'[,\s"]', '', regex=True)
+    values = pd.to_numeric(cleaned, errors='coerce')
+    # Ô trống được tính là 0 như trước, chỉ báo lỗi với giá trị không đọc được
+    failed = values.isna() & series.notna() & cleaned.ne('')
+    return values.fillna(0).astype(float), failed
+
+def account_mismatch(ids, accounts):
+    """Mặt nạ dòng có ID không kết thúc bằng các số cuối của STK (vector hóa)
+    
+    So chuỗi chữ số, nên STK phải được đọc dạng chuỗi (RAW_DTYPES). Dòng không có STK
+    thì không kiểm tra được, không bị đánh dấu.
+    """
+    if pd.api.types.is_numeric_dtype(accounts):
+        # STK đã bị đọc thành số: mất số 0 ở đầu và bị làm tròn từ 16 chữ số, không so được
+        return np.zeros(len(ids), dtype=bool)
+    # Chỉ kiểm tra các cặp (ID, STK) khác nhau (ít hơn nhiều so với số dòng) rồi ánh xạ lại
+    id_codes, id_values = pd.factorize(ids.astype(str).str.strip())
+    account_codes, account_values = pd.factorize(accounts.fillna('').astype(str))
+    pair_codes, pairs = pd.factorize(id_codes.astype(np.int64) * len(account_values) + account_codes)
+    id_values = pd.Series(id_values[pairs // len(account_values)])
+    account_values = pd.Series(account_values[pairs % len(account_values)])
+    
+    suffix = id_values.str.extract(r'(\d+)$', expand=False).fillna('')
+    digits = account_values.str.replace(r'\.0+$', '', regex=True).str.replace(r'\D', '', regex=True)
+    matches = np.char.endswith(digits.to_numpy(dtype=str), suffix.to_numpy(dtype=str))
+    mismatch = (digits != '').to_numpy() & ((suffix.str.len() < ID_ACCOUNT_DIGITS).to_numpy() | ~matches)
+    return mismatch[pair_codes]
+
+def file_digest(path, size=None):
+    """Tính SHA-256 của file (hoặc `size` byte đầu) theo từng khối, trả về đối tượng hash"""
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest
+
+def file_sha256(path, size=None):
+    """Tính SHA-256 của file (hoặc `size` byte đầu)"""
+    return file_digest(path, size).hexdigest()
+
+def read_source(source_path=DATA_FILE):
+    """Đọc toàn bộ byte của file nguồn một lần, kèm chữ ký (kích thước, mtime, SHA-256)"""
+    # Lấy mtime trước khi đọc: nếu file bị ghi thêm trong lúc đọc, lần sau sẽ phải kiểm tra hash
+    mtime_ns = os.stat(source_path).st_mtime_ns
+    with open(source_path, 'rb') as f:
+        content = f.read()
+    signature = {
+        'schema': SNAPSHOT_SCHEMA_VERSION,
+        'size': len(content),
+        'mtime_ns': mtime_ns,
+        'sha256': hashlib.sha256(content).hexdigest(),
+    }
+    return content, signature
+
+def signature_matches(signature, source_path=DATA_FILE):
+    """Chữ ký đã lưu (bản chụp, kho dùng chung) có còn khớp với file nguồn hiện tại không"""
+    stat = os.stat(source_path)
+    if signature.get('schema') != SNAPSHOT_SCHEMA_VERSION or signature.get('size') != stat.st_size:
+        return False
+    # mtime khác nhưng nội dung giống (vd. copy lại file) vẫn dùng được
+    return signature.get('mtime_ns') == stat.st_mtime_ns or signature.get('sha256') == file_sha256(source_path)
+
+def load_snapshot(source_path=DATA_FILE, snapshot_path=SNAPSHOT_FILE):
+    """Đọc bản chụp Feather nếu còn khớp với file nguồn, trả về (dữ liệu, chữ ký) hoặc None"""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with pa.memory_map(snapshot_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        signature = json.loads(metadata.get(b'source_signature', b'{}'))
+        if not signature_matches(signature, source_path):
+            return None
+        table = feather.read_table(snapshot_path, memory_map=True)
+        return table.to_pandas(), signature
+    except Exception:
+        return None
+
+def save_snapshot(df, signature, snapshot_path=SNAPSHOT_FILE):
+    """Ghi bản chụp Feather (không nén, để memory-map) kèm chữ ký của phần dữ liệu đã đọc"""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return False
+    try:
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'source_signature': json.dumps(signature).encode(),
+        })
+        os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+        # Ghi ra file tạm rồi đổi tên để tiến trình khác không đọc phải file dở dang
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, snapshot_path)
+        return True
+    except Exception:
+        return False
+
+def detect_encoding(content, sample_size=ENCODING_SAMPLE_SIZE):
+    """Đoán encoding từ một mẫu đầu file, trả về (encoding, có cần sửa mojibake không)"""
+    sample = content[:sample_size]
+    if sample.startswith(codecs.BOM_UTF8):
+        candidates = ('utf-8-sig',)
+    else:
+        candidates = ('utf-8', 'cp1252', 'latin-1')
+    for encoding in candidates:
+        try:
+            # final=False: mẫu có thể cắt ngang một ký tự nhiều byte ở cuối
+            text = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            break
+        except UnicodeDecodeError:
+            continue
+    
+    # Mojibake: văn bản UTF-8 từng bị đọc nhầm bằng cp1252 rồi lưu lại dưới dạng UTF-8
+    # (vd. "NgÃ y"); mã hóa ngược về cp1252 sẽ ra lại chuỗi UTF-8 hợp lệ
+    repair = False
+    if encoding.startswith('utf-8') and not text.isascii():
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(text.encode('cp1252'), final=False)
+            repair = True
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return encoding, repair
+
+def parse_csv_bytes(content, encoding=None, repair=False):
+    """Đọc CSV từ bytes, chỉ giải mã một lần; trả về (DataFrame thô, thông tin encoding)"""
+    start = time.perf_counter()
+    if encoding is None:
+        encoding, repair = detect_encoding(content)
+    detect_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    # thousands=',' để bộ đọc C chuyển luôn các cột tiền "10,000,000" sang số
+    if repair:
+        text = content.decode(encoding)
+        try:
+            text = text.encode('cp1252').decode('utf-8')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            # Chỉ phần mẫu bị mojibake, phần còn lại không sửa được: giữ nguyên văn bản
+            repair = False
+        df = pd.read_csv(io.StringIO(text), thousands=',', dtype=RAW_DTYPES)
+    else:
+        try:
+            df = pd.read_csv(io.BytesIO(content), encoding=encoding, thousands=',', dtype=RAW_DTYPES)
+        except UnicodeDecodeError:
+            # Mẫu đầu file đánh lừa bộ đoán: latin-1 giải mã được mọi byte
+            encoding = 'latin-1'
+            df = pd.read_csv(io.BytesIO(content), encoding=encoding, thousands=',', dtype=RAW_DTYPES)
+    
+    diagnostics = {
+        'encoding': encoding,
+        'repair': repair,
+        'detect_ms': detect_ms,
+        'decode_ms': (time.perf_counter() - start) * 1000,  # giải mã + đọc CSV
+    }
+    return df, diagnostics
+
+def clean_transactions(df):
+    """Lọc các dòng giao dịch chính và làm sạch dữ liệu, báo LedgerError nếu lỗi"""
+    if len(df.columns) < len(RAW_COLUMNS):
+        raise LedgerError(
+            f"File CSV không đủ cột. Cần {len(RAW_COLUMNS)} cột, nhưng chỉ có {len(df.columns)} cột",
+            hint="Thứ tự cột: " + ", ".join(col.strip() for col in RAW_COLUMNS),
+        )
+    
+    # Lọc chỉ lấy các dòng giao dịch chính (bỏ qua các dòng chi tiết)
+    # Dòng giao dịch chính có đầy đủ thông tin trong các cột
+    try:
+        mask = (
+            df.iloc[:, 0].notna() &  # Ngày
+            df.iloc[:, 1].notna() &  # Tổng tiền
+            df.iloc[:, 7].notna() &  # Shareholder
+            df.iloc[:, 8].notna() &  # ID
+            ~df.iloc[:, 0].astype(str).str.startswith('-')  # Không bắt đầu bằng dấu -
+        )
+        
+        # Cột thừa phía sau (vd. ghi chú thêm trong Excel) được bỏ qua
+        main_transactions = df.loc[mask, df.columns[:len(RAW_COLUMNS)]].reset_index(drop=True)
+            
+    except Exception as e:
+        raise LedgerError(f"Lỗi khi lọc dữ liệu: {e}") from e
+    
+    # Đặt tên cột chuẩn thay cho header gốc
+    main_transactions.columns = RAW_COLUMNS
+    
+    # Làm sạch dữ liệu (vector hóa trên toàn cột)
+    try:
+        money_errors = pd.Series(False, index=main_transactions.index)
+        for raw_col, clean_col in MONEY_COLUMNS.items():
+            values, failed = parse_money(main_transactions[raw_col])
+            main_transactions[clean_col] = values
+            money_errors |= failed
+        main_transactions[COL_MONEY_PARSE_ERROR] = money_errors
+        
+        # Chuyển đổi ngày
+        main_transactions[COL_DATE_DATETIME] = pd.to_datetime(main_transactions["Ngày"], format='%d/%m/%Y', errors='coerce')
+        
+        # Cần STK (bị bỏ khi thu gọn) nên kiểm tra ngay tại đây, giữ lại dạng cột cờ
+        main_transactions[COL_ACCOUNT_MISMATCH] = account_mismatch(
+            main_transactions[COL_ID], main_transactions[COL_ACCOUNT]
+        )
+        
+    except Exception as e:
+        raise LedgerError(f"Lỗi khi xử lý dữ liệu: {e}") from e
+    
+    return compact_transactions(main_transactions)
+
+def compact_transactions(df):
+    """Thu gọn bảng giao dịch: chỉ giữ LEAN_COLUMNS, văn bản dạng category, tổng tiền int64"""
+    compact = df[LEAN_COLUMNS].copy()
+    for col in CATEGORY_COLUMNS:
+        compact[col] = compact[col].astype('category')
+    # VNĐ không có phần lẻ: lưu tổng tiền dạng số nguyên để cộng dồn chính xác
+    compact[COL_TOTAL_MONEY_CLEAN] = compact[COL_TOTAL_MONEY_CLEAN].round().astype('int64')
+    return compact
+
+def concat_transactions(frames):
+    """Nối các bảng giao dịch, hợp nhất danh mục để cột category không bị đổi sang object"""
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if col in CATEGORY_COLUMNS:
+            columns[col] = pd.api.types.union_categoricals([part.astype('category') for part in parts])
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def repair_mojibake(series):
+    """Sửa từng giá trị văn bản UTF-8 bị đọc nhầm qua cp1252 (dùng khi đọc dạng luồng)"""
+    def repair(value):
+        try:
+            return value.encode('cp1252').decode('utf-8')
+        except (UnicodeEncodeError, UnicodeDecodeError, AttributeError):
+            return value
+    return series.map(repair, na_action='ignore')
+
+def read_chunks(f, encoding, repair, chunksize):
+    """Đọc + làm sạch file đang mở theo từng khối, trả về (các khối đã làm sạch, bảng tổng hợp)"""
+    chunks, holders = [], None
+    for raw in pd.read_csv(f, encoding=encoding, thousands=',', dtype=RAW_DTYPES, chunksize=chunksize):
+        cleaned = clean_transactions(raw)
+        if cleaned.empty:
+            # Khối chỉ có dòng chi tiết "- ..." / dòng trống: cột category của bảng rỗng có
+            # danh mục kiểu số, không gộp được với các khối khác
+            continue
+        if repair:
+            for col in (COL_BANK, COL_SHAREHOLDER):
+                cleaned[col] = repair_mojibake(cleaned[col]).astype('category')
+        chunks.append(cleaned)
+        # Gộp dần để bảng tổng hợp không lớn hơn số cổ đông
+        holders = combine_holder_totals([holders, summarize_holders(cleaned)])
+    return chunks, holders
+
+def stream_transactions(source_path=DATA_FILE, chunksize=CHUNK_SIZE):
+    """Đọc CSV theo từng khối: lọc + làm sạch mỗi khối rồi gộp ngay vào
+    bảng giao dịch gọn (LEAN_COLUMNS) và bảng tổng hợp theo cổ đông.
+    
+    Trả về (dữ liệu gọn, bảng tổng hợp, chữ ký nguồn).
+    """
+    mtime_ns = os.stat(source_path).st_mtime_ns
+    with open(source_path, 'rb') as f:
+        start = time.perf_counter()
+        encoding, repair = detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+        detect_ms = (time.perf_counter() - start) * 1000
+        f.seek(0)
+        
+        start = time.perf_counter()
+        try:
+            chunks, holders = read_chunks(f, encoding, repair, chunksize)
+        except UnicodeDecodeError:
+            # Mẫu đầu file đánh lừa bộ đoán (như parse_csv_bytes): đọc lại từ đầu bằng latin-1
+            encoding, repair = 'latin-1', False
+            f.seek(0)
+            chunks, holders = read_chunks(f, encoding, repair, chunksize)
+        # Vị trí hiện tại = số byte đã đọc, dùng cho việc nạp thêm sau này
+        size = f.tell()
+    
+    main_transactions = concat_transactions(chunks) if chunks else pd.DataFrame(columns=LEAN_COLUMNS)
+    signature = {
+        'schema': SNAPSHOT_SCHEMA_VERSION,
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'sha256': file_sha256(source_path, size),
+        'decode': {
+            'encoding': encoding,
+            'repair': repair,
+            'detect_ms': detect_ms,
+            'decode_ms': (time.perf_counter() - start) * 1000,  # giải mã + đọc + làm sạch
+        },
+    }
+    return main_transactions, holders, signature
+
+def read_transactions(source_path=DATA_FILE):
+    """Đọc và xử lý dữ liệu từ file CSV
+    
+    Trả về (dữ liệu, bảng tổng hợp theo cổ đông, chữ ký nguồn); báo LedgerError nếu
+    không đọc được file hoặc không có giao dịch hợp lệ.
+    """
+    try:
+        # Dùng bản chụp đã làm sạch nếu file CSV chưa thay đổi
+        with perf_metrics.timed('load.snapshot'):
+            snapshot = load_snapshot(source_path)
+        if snapshot is not None:
+            main_transactions, signature = snapshot
+            with perf_metrics.timed('load.summary'):
+                holders = summarize_holders(main_transactions)
+            return main_transactions, holders, signature
+        
+        # File quá lớn: đọc dạng luồng để bộ nhớ đỉnh không gấp nhiều lần kích thước file
+        if os.path.getsize(source_path) > STREAMING_THRESHOLD_BYTES:
+            with perf_metrics.timed('load.stream'):
+                main_transactions, holders, signature = stream_transactions(source_path)
+            if main_transactions.empty:
+                raise LedgerError("Không tìm thấy dữ liệu giao dịch hợp lệ trong file CSV")
+            with perf_metrics.timed('load.save_snapshot'):
+                save_snapshot(main_transactions, signature)
+            return main_transactions, holders, signature
+        
+        # Đọc file một lần, đoán encoding từ mẫu đầu file rồi giải mã toàn bộ đúng một lần
+        with perf_metrics.timed('load.read'):
+            content, signature = read_source(source_path)
+        with perf_metrics.timed('load.decode'):
+            df, signature['decode'] = parse_csv_bytes(content)
+        
+        # Kiểm tra xem DataFrame có dữ liệu không
+        if df.empty:
+            raise LedgerError("File CSV không có dữ liệu")
+        
+        with perf_metrics.timed('load.clean'):
+            main_transactions = clean_transactions(df)
+        
+        # Kiểm tra xem có dữ liệu sau khi lọc không
+        if main_transactions.empty:
+            raise LedgerError(
+                "Không tìm thấy dữ liệu giao dịch hợp lệ trong file CSV",
+                hint="Vui lòng kiểm tra lại định dạng dữ liệu trong file CSV",
+            )
+        
+        with perf_metrics.timed('load.save_snapshot'):
+            save_snapshot(main_transactions, signature)
+        with perf_metrics.timed('load.summary'):
+            holders = summarize_holders(main_transactions)
+        return main_transactions, holders, signature
+        
+    except LedgerError:
+        raise
+    except FileNotFoundError as e:
+        raise LedgerError(
+            f"Không tìm thấy tệp '{os.path.basename(source_path)}'",
+            hint="Vui lòng đảm bảo tệp dữ liệu nằm cùng thư mục với ứng dụng",
+        ) from e
+    except Exception as e:
+        raise LedgerError(f"Lỗi không xác định: {e}") from e
+
+def normalize_id(value):
+    """Chuẩn hóa ID cổ đông để so khớp (bỏ khoảng trắng, viết hoa)"""
+    return str(value).strip().upper()
+
+def normalize_id_series(series):
+    """Chuẩn hóa cả cột ID (vector hóa), cùng quy tắc với normalize_id"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Chỉ chuẩn hóa danh mục (ít hơn nhiều so với số dòng) rồi ánh xạ theo mã;
+        # mã -1 (giá trị trống) trỏ vào phần tử cuối 'NAN' như str(nan).upper()
+        categories = series.cat.categories.astype(str).str.strip().str.upper()
+        lookup = np.append(categories.to_numpy(dtype=object), 'NAN')
+        return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+    return series.astype(str).str.strip().str.upper()
+
+def summarize_holders(df):
+    """Tổng hợp theo cổ đông: tên, tổng tiền, tổng ĐVĐT, số giao dịch, ngày đầu/cuối"""
+    grouped = df.groupby(normalize_id_series(df[COL_ID]).rename(COL_ID), sort=False)
+    return pd.DataFrame({
+        COL_SHAREHOLDER: grouped[COL_SHAREHOLDER].first(),
+        COL_TOTAL_MONEY_CLEAN: grouped[COL_TOTAL_MONEY_CLEAN].sum(),
+        COL_QUANTITY_DVDT_CLEAN: grouped[COL_QUANTITY_DVDT_CLEAN].sum(),
+        COL_TX_COUNT: grouped.size(),
+        COL_FIRST_DATE: grouped[COL_DATE_DATETIME].min(),
+        COL_LAST_DATE: grouped[COL_DATE_DATETIME].max(),
+    })
+
+def combine_holder_totals(parts):
+    """Gộp nhiều bảng tổng hợp (từ các khối hoặc phần dữ liệu mới) thành một"""
+    parts = [part for part in parts if part is not None]
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=0, sort=False).agg(HOLDER_AGGREGATIONS)
+
+def add_running_totals(sorted_df, keys, start_money=0, start_dvdt=0):
+    """Thêm cột tiền/ĐVĐT lũy kế và giá mua trung bình theo từng cổ đông
+    
+    `start_money`/`start_dvdt` là lũy kế trước đó của mỗi dòng (khi nạp thêm dữ liệu mới).
+    """
+    grouped = sorted_df.groupby(keys, sort=False)
+    sorted_df[COL_CUM_MONEY] = grouped[COL_TOTAL_MONEY_CLEAN].cumsum() + start_money
+    sorted_df[COL_CUM_DVDT] = grouped[COL_QUANTITY_DVDT_CLEAN].cumsum() + start_dvdt
+    # Tính giá mua trung bình (tránh chia cho 0)
+    cum_dvdt = sorted_df[COL_CUM_DVDT].to_numpy()
+    sorted_df[COL_AVG_PRICE] = np.divide(
+        sorted_df[COL_CUM_MONEY].to_numpy(dtype=float), cum_dvdt,
+        out=np.zeros(len(sorted_df)), where=cum_dvdt > 0
+    )
+    return sorted_df
+
+def build_id_index(df):
+    """Tạo chỉ mục ID chuẩn hóa -> vị trí các dòng giao dịch (đã sắp xếp theo ngày)"""
+    # Sắp xếp ổn định theo ngày một lần để lịch sử của mỗi cổ đông đã đúng thứ tự
+    sorted_df = df.sort_values(COL_DATE_DATETIME, kind='mergesort').reset_index(drop=True)
+    keys = normalize_id_series(sorted_df[COL_ID])
+    positions = keys.groupby(keys, sort=False).indices
+    # Lũy kế cho bảng lịch sử và biểu đồ: một lần groupby/cumsum trên toàn sổ
+    add_running_totals(sorted_df, keys)
+    return sorted_df, positions
+
+def append_to_index(id_index, new_rows):
+    """Gộp các giao dịch mới vào chỉ mục, chỉ dựng lại toàn bộ khi ngày bị lùi"""
+    sorted_df, positions = id_index
+    if new_rows.empty:
+        return id_index
+    new_rows = new_rows.sort_values(COL_DATE_DATETIME, kind='mergesort').reset_index(drop=True)
+    last_date = sorted_df[COL_DATE_DATETIME].iloc[-1] if len(sorted_df) else pd.NaT
+    first_new_date = new_rows[COL_DATE_DATETIME].iloc[0]
+    if len(sorted_df) and (pd.isna(last_date) or (pd.notna(first_new_date) and first_new_date < last_date)):
+        # Dòng mới có ngày cũ hơn dữ liệu hiện có: sắp xếp lại toàn bộ (không cần đọc lại CSV)
+        return build_id_index(concat_transactions([sorted_df.drop(columns=RUNNING_COLUMNS), new_rows]))
+    
+    # Trường hợp thường gặp: dòng mới nối vào cuối, chỉ cập nhật các ID có giao dịch mới
+    new_keys = normalize_id_series(new_rows[COL_ID])
+    new_positions = new_keys.groupby(new_keys, sort=False).indices
+    # Lũy kế của dòng mới tiếp nối từ dòng cuối cùng hiện có của cùng cổ đông
+    last_rows = pd.Series({key: positions[key][-1] for key in new_positions if key in positions}, dtype='int64')
+    start_money = new_keys.map(sorted_df[COL_CUM_MONEY].iloc[last_rows.to_numpy()].set_axis(last_rows.index)).fillna(0)
+    start_dvdt = new_keys.map(sorted_df[COL_CUM_DVDT].iloc[last_rows.to_numpy()].set_axis(last_rows.index)).fillna(0)
+    add_running_totals(new_rows, new_keys, start_money.astype(sorted_df[COL_CUM_MONEY].dtype), start_dvdt)
+    
+    combined = concat_transactions([sorted_df, new_rows])
+    positions = dict(positions)
+    for key, rows in new_positions.items():
+        rows = rows + len(sorted_df)
+        positions[key] = np.concatenate([positions[key], rows]) if key in positions else rows
+    return combined, positions
+
+def open_ledger(source_path=DATA_FILE):
+    """Sổ giao dịch: chỉ mục ID + bảng tổng hợp + vị trí byte đã nạp (báo LedgerError nếu lỗi)"""
+    df, holders, signature = read_transactions(source_path)
+    with perf_metrics.timed('load.index'):
+        id_index = build_id_index(df)
+    return {
+        'index': id_index,
+        'holders': holders,
+        'offset': signature['size'],
+        'sha256': signature['sha256'],
+        'decode': signature['decode'],
+        'lock': threading.Lock(),
+    }
+
+def refresh_ledger(ledger, source_path=DATA_FILE):
+    """Nạp phần mới ghi nối vào cuối file CSV vào sổ giao dịch
+    
+    Trả về số giao dịch mới đã nạp, hoặc None nếu phần dữ liệu cũ đã bị sửa
+    (khi đó cần tải lại toàn bộ).
+    """
+    with ledger['lock']:
+        mtime_ns = os.stat(source_path).st_mtime_ns
+        offset = ledger['offset']
+        # Kiểm tra phần đã nạp bằng hash đọc theo khối, không nạp cả file vào bộ nhớ
+        digest = file_digest(source_path, offset)
+        if digest.hexdigest() != ledger['sha256']:
+            return None
+        with open(source_path, 'rb') as f:
+            header = f.readline()
+            f.seek(max(offset - 1, 0))
+            previous = f.read(1) if offset else b'\n'
+            tail = f.read()
+        if not tail.strip():
+            return 0
+        # Dòng cuối lần trước chưa kết thúc bằng xuống dòng mà phần mới lại viết tiếp vào nó
+        if previous != b'\n' and not tail.startswith((b'\n', b'\r')):
+            return None
+        
+        # Ghép header với phần đuôi để dùng lại đúng quy trình làm sạch
+        decode = ledger['decode']
+        df, _ = parse_csv_bytes(header + tail.lstrip(b'\r\n'), decode['encoding'], decode['repair'])
+        try:
+            new_rows = clean_transactions(df)
+        except LedgerError:
+            return None
+        
+        # Thay cả bộ chỉ mục một lần để các phiên đang đọc không thấy trạng thái dở dang
+        ledger['index'] = append_to_index(ledger['index'], new_rows)
+        # Lợi suất, NAV cuối kỳ và kết quả kiểm tra dữ liệu thuộc phiên bản dữ liệu cũ
+        ledger.pop('returns', None)
+        ledger.pop('nav_snapshots', None)
+        ledger.pop('issues', None)
+        ledger['holders'] = combine_holder_totals([ledger['holders'], summarize_holders(new_rows)])
+        digest.update(tail)
+        ledger['offset'] = offset + len(tail)
+        ledger['sha256'] = digest.hexdigest()
+        signature = {
+            'schema': SNAPSHOT_SCHEMA_VERSION,
+            'size': ledger['offset'],
+            'mtime_ns': mtime_ns,
+            'sha256': ledger['sha256'],
+            'decode': decode,
+        }
+        save_snapshot(ledger['index'][0].drop(columns=RUNNING_COLUMNS), signature)
+        return len(new_rows)
+
+def validate_transactions(df):
+    """Kiểm tra chất lượng toàn sổ trong một lượt vector hóa (các mục trong ISSUE_CHECKS)
+    
+    Trả về {'counts': {mã: số dòng}, 'rows': các dòng có vấn đề kèm một cột đúng/sai
+    cho mỗi mục, 'transactions': tổng số dòng}. Giao dịch trùng chỉ đánh dấu từ lần thứ hai.
+    """
+    money = df[COL_TOTAL_MONEY_CLEAN].to_numpy(dtype=float)
+    price = df[COL_PRICE_DVDT_CLEAN].to_numpy(dtype=float)
+    quantity = df[COL_QUANTITY_DVDT_CLEAN].to_numpy(dtype=float)
+    # So trùng trên ID đã chuẩn hóa: cùng cổ đông nhưng khác khoảng trắng/chữ hoa vẫn là trùng
+    duplicate_keys = df[DUPLICATE_COLUMNS].assign(**{COL_ID: normalize_id_series(df[COL_ID])})
+    flags = {
+        'money': df[COL_MONEY_PARSE_ERROR].to_numpy(dtype=bool),
+        'date': df[COL_DATE_DATETIME].isna().to_numpy(),
+        'duplicate': duplicate_keys.duplicated(keep='first').to_numpy(),
+        'amount': np.abs(money - price * quantity) > price * AMOUNT_TOLERANCE_DVDT,
+        'account': df[COL_ACCOUNT_MISMATCH].to_numpy(dtype=bool),
+    }
+    flagged = np.logical_or.reduce(list(flags.values())) if len(df) else np.zeros(0, dtype=bool)
+    
+    rows = df.loc[flagged, ISSUE_REPORT_COLUMNS].copy()
+    for key, label in ISSUE_CHECKS.items():
+        rows[label] = flags[key][flagged]
+    return {
+        'counts': {key: int(mask.sum()) for key, mask in flags.items()},
+        'rows': rows.reset_index(drop=True),
+        'transactions': len(df),
+    }
+
+def ledger_issues(ledger):
+    """Kết quả validate_transactions của sổ, tính một lần cho mỗi phiên bản dữ liệu
+    
+    Nhớ trong dict sổ theo SHA-256 phần file đã nạp; refresh_ledger bỏ kết quả cũ.
+    """
+    with ledger['lock']:
+        cached = ledger.get('issues')
+        sorted_df, sha256 = ledger['index'][0], ledger['sha256']
+        if cached is not None and cached['sha256'] == sha256:
+            perf_metrics.cache_event('issues', hit=True)
+            return cached
+    
+    perf_metrics.cache_event('issues', hit=False)
+    with perf_metrics.timed('load.validate'):
+        issues = validate_transactions(sorted_df)
+    issues['sha256'] = sha256
+    with ledger['lock']:
+        if ledger['sha256'] == sha256:
+            ledger['issues'] = issues
+    return issues
+
+def lookup_summary(holders, shareholder_id):
+    """Lấy dòng tổng hợp của một cổ đông (tổng tiền, ĐVĐT, số giao dịch, ngày), hoặc None"""
+    try:
+        row = holders.index.get_loc(normalize_id(shareholder_id))
+    except KeyError:
+        return None
+    # Đọc từng ô theo vị trí: nhanh hơn nhiều so với holders.loc (tạo Series mới mỗi lần)
+    return {col: holders[col].iat[row] for col in holders.columns}
+
+def lookup_shareholder(id_index, shareholder_id):
+    """Lấy lịch sử giao dịch của một cổ đông từ chỉ mục, O(1) + số giao dịch"""
+    sorted_df, positions = id_index
+    rows = positions.get(normalize_id(shareholder_id))
+    if rows is None:
+        return sorted_df.iloc[0:0].copy()
+    return sorted_df.iloc[rows].copy()
+
+def id_trigrams(value):
+    """Tập trigram của ID, có đệm đầu/cuối để ký tự đầu và cuối cũng được tính"""
+    padded = f"$${value}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_suggestion_index(ids):
+    """Chỉ mục trigram -> vị trí ID (đã chuẩn hóa), dùng cho gợi ý ID gần đúng"""
+    ids = np.asarray(sorted({normalize_id(value) for value in ids}), dtype=object)
+    postings = {}
+    for position, value in enumerate(ids):
+        for gram in id_trigrams(value):
+            postings.setdefault(gram, []).append(position)
+    return {
+        'ids': ids,
+        'grams': {gram: np.asarray(rows, dtype=np.int32) for gram, rows in postings.items()},
+    }
+
+def edit_distance(a, b, max_distance):
+    """Khoảng cách Levenshtein; trả về max_distance + 1 ngay khi chắc chắn vượt ngưỡng"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def suggest_ids(index, query, limit=SUGGESTION_LIMIT, max_distance=SUGGESTION_MAX_DISTANCE):
+    """Các ID gần giống ID đã nhập nhất (khoảng cách sửa <= max_distance), gần nhất trước"""
+    query = normalize_id(query)
+    if len(query) < SUGGESTION_MIN_LENGTH:
+        return []
+    query_grams = id_trigrams(query)
+    postings = [index['grams'][gram] for gram in query_grams if gram in index['grams']]
+    if not postings:
+        return []
+    
+    # Mỗi lần sửa làm mất tối đa 3 trigram của ID đã nhập: ứng viên phải chung ít nhất chừng này
+    min_shared = max(len(query_grams) - 3 * max_distance, 1)
+    shared = np.bincount(np.concatenate(postings), minlength=len(index['ids']))
+    candidates = np.flatnonzero(shared >= min_shared)
+    if len(candidates) > SUGGESTION_CANDIDATES:
+        candidates = candidates[np.argsort(-shared[candidates], kind='stable')[:SUGGESTION_CANDIDATES]]
+    
+    scored = []
+    for position in candidates:
+        value = index['ids'][position]
+        distance = edit_distance(query, value, max_distance)
+        if distance <= max_distance:
+            scored.append((distance, value))
+    scored.sort()
+    return [value for _, value in scored[:limit]]
+
+def mask_id(value, visible_digits=3):
+    """Che phần số tài khoản của ID khi hiển thị gợi ý, chỉ để lại vài số cuối"""
+    name = value.rstrip('0123456789')
+    digits = value[len(name):]
+    hidden = max(len(digits) - visible_digits, 0)
+    return name + '•' * hidden + digits[hidden:]
+
+def format_currency(amount):
+    """Format số tiền theo định dạng Việt Nam"""
+    return f"{amount:,.0f}".replace(',', '.')
+
+def calculate_performance(nav, investment):
+    """Tính hiệu suất đầu tư với xử lý lỗi chia cho 0"""
+    if investment > 0:
+        return (nav / investment - 1) * 100
+    else:
+        return 0
+
+def batch_nav(holders, prices):
+    """Tính NAV, lãi/lỗ và hiệu suất (%) cho mọi cổ đông ở một hoặc nhiều mức giá ĐVĐT
+    
+    `holders` là bảng tổng hợp theo cổ đông (cần tổng tiền và tổng ĐVĐT). Kết quả là
+    DataFrame (cổ đông × mức giá) với cột hai cấp (chỉ số, giá), tính trong một lượt NumPy.
+    """
+    prices = np.atleast_1d(np.asarray(prices, dtype=float))
+    units = holders[COL_QUANTITY_DVDT_CLEAN].to_numpy(dtype=float)[:, None]
+    invested = holders[COL_TOTAL_MONEY_CLEAN].to_numpy(dtype=float)[:, None]
+    
+    nav = units * prices[None, :]
+    pnl = nav - invested
+    # Cùng công thức với calculate_performance: (nav / đầu tư - 1) * 100, bằng 0 nếu chưa đầu tư
+    performance = np.divide(pnl * 100, invested, out=np.zeros_like(nav), where=invested > 0)
+    
+    columns = pd.MultiIndex.from_product([NAV_METRICS, prices], names=['Chỉ số', 'Giá ĐVĐT'])
+    return pd.DataFrame(np.concatenate([nav, pnl, performance], axis=1), index=holders.index, columns=columns)
+
+def solve_xirr(codes, amounts, years, nav):
+    """Giải XIRR (tỉ lệ/năm) cho mọi cổ đông cùng lúc
+    
+    Giao dịch i là khoản nộp `amounts[i]` của cổ đông `codes[i]`, cách ngày định giá
+    `years[i]` năm; `nav` là giá trị của mỗi cổ đông tại ngày định giá. Nghiệm r thỏa
+    nav = Σ amount·(1 + r)^years. Mỗi vòng lặp là một bước Newton cho mọi cổ đông
+    (tổng theo cổ đông bằng np.bincount); bước nào ra ngoài khoảng chứa nghiệm thì chia
+    đôi khoảng. Trả về NaN khi không xác định (chưa nộp tiền, NAV = 0, nộp đúng ngày định giá),
+    khi nghiệm nằm ngoài XIRR_BOUNDS hoặc khi chưa hội tụ sau XIRR_MAX_ITERATIONS vòng.
+    """
+    n = len(nav)
+    invested = np.bincount(codes, amounts, n)
+    weighted_years = np.bincount(codes, amounts * years, n)
+    solvable = (invested > 0) & (weighted_years > 0) & (nav > 0)
+    lo = np.full(n, XIRR_BOUNDS[0])
+    hi = np.full(n, XIRR_BOUNDS[1])
+    done = np.zeros(n, dtype=bool)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        def residual(rate):
+            """nav - Σ amount·(1 + r)^years của mỗi cổ đông (giảm dần theo r)"""
+            grown = amounts * np.exp(years * np.log1p(rate)[codes])
+            return nav - np.bincount(codes, grown, n), grown
+        
+        # Phần dư cùng dấu ở hai đầu khoảng: nghiệm nằm ngoài XIRR_BOUNDS
+        solvable &= (residual(lo)[0] >= 0) & (residual(hi)[0] <= 0)
+        
+        # Điểm xuất phát: lợi suất đơn giản chia theo thời gian nộp bình quân
+        rate = (nav / invested) ** (invested / weighted_years) - 1
+        rate = np.where(solvable & np.isfinite(rate), np.clip(rate, lo, hi), 0.0)
+        for _ in range(XIRR_MAX_ITERATIONS):
+            value, grown = residual(rate)
+            slope = -np.bincount(codes, grown * years, n) / (1 + rate)
+            too_low = value > 0
+            lo = np.where(too_low, rate, lo)
+            hi = np.where(too_low, hi, rate)
+            step = rate - value / slope
+            step = np.where((step > lo) & (step < hi), step, (lo + hi) / 2)
+            done = np.abs(step - rate) <= XIRR_TOLERANCE * (1 + np.abs(rate))
+            rate = step
+            if done[solvable].all():
+                break
+    return np.where(solvable & done, rate, np.nan)
+
+def batch_returns(id_index, holders, price, as_of=None):
+    """XIRR, TWR và TWR theo năm (%) của mọi cổ đông ở giá ĐVĐT `price`, tính trong một lượt
+    
+    Định giá tại ngày `as_of` (mặc định hôm nay). Quỹ tính theo đơn vị nên TWR của một
+    cổ đông chỉ phụ thuộc giá: giá hiện tại / giá mua lần đầu - 1. TWR theo năm chỉ tính
+    khi đã đầu tư từ một năm trở lên (ngắn hơn thì NaN).
+    """
+    as_of = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+    sorted_df, _ = id_index
+    codes = holders.index.get_indexer(normalize_id_series(sorted_df[COL_ID]))
+    dates = sorted_df[COL_DATE_DATETIME].to_numpy()
+    valid = (codes >= 0) & ~np.isnat(dates)
+    codes = codes[valid]
+    amounts = sorted_df[COL_TOTAL_MONEY_CLEAN].to_numpy(dtype=float)[valid]
+    units = sorted_df[COL_QUANTITY_DVDT_CLEAN].to_numpy(dtype=float)[valid]
+    unit_prices = sorted_df[COL_PRICE_DVDT_CLEAN].to_numpy(dtype=float)[valid]
+    # Giao dịch ghi ngày sau ngày định giá coi như nộp đúng ngày định giá
+    years = np.maximum((as_of.to_datetime64() - dates[valid]) / np.timedelta64(1, 'D'), 0) / DAYS_PER_YEAR
+    
+    n = len(holders)
+    nav = np.bincount(codes, units, n) * float(price)
+    xirr = solve_xirr(codes, amounts, years, nav)
+    
+    # Bảng đã sắp theo ngày: lần xuất hiện đầu tiên của mỗi cổ đông là lần mua đầu tiên
+    holder_codes, first = np.unique(codes, return_index=True)
+    first_price = np.full(n, np.nan)
+    first_price[holder_codes] = unit_prices[first]
+    held_years = np.zeros(n)
+    held_years[holder_codes] = years[first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        twr = np.where(first_price > 0, float(price) / first_price - 1, np.nan)
+        twr_annual = np.where(held_years >= 1, (1 + twr) ** (1 / held_years) - 1, np.nan)
+    
+    return pd.DataFrame({
+        COL_XIRR: xirr * 100,
+        COL_TWR: twr * 100,
+        COL_TWR_ANNUAL: twr_annual * 100,
+    }, index=holders.index)
+
+def fund_returns(ledger, price, as_of=None):
+    """Bảng lợi suất (batch_returns) của sổ `ledger`, nhớ sẵn theo (giá, ngày định giá)
+    
+    Bộ nhớ đệm nằm trong chính dict sổ: mỗi dict sổ là một phiên bản dữ liệu và
+    refresh_ledger bỏ nó khi nạp thêm giao dịch.
+    """
+    as_of = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+    key = (float(price), as_of)
+    with ledger['lock']:
+        cache = ledger.setdefault('returns', OrderedDict())
+        # Lấy chỉ mục và bảng tổng hợp cùng lúc (refresh_ledger thay cả hai trong khóa)
+        id_index, holders = ledger['index'], ledger['holders']
+        if key in cache:
+            cache.move_to_end(key)
+            perf_metrics.cache_event('returns', hit=True)
+            return cache[key]
+    
+    perf_metrics.cache_event('returns', hit=False)
+    with perf_metrics.timed('returns.build'):
+        returns = batch_returns(id_index, holders, price, as_of)
+    with ledger['lock']:
+        cache[key] = returns
+        while len(cache) > RETURNS_CACHE_ENTRIES:
+            cache.popitem(last=False)
+    return returns
+
+def format_percent(value):
+    """Tỉ lệ % với 2 chữ số lẻ, "—" nếu không xác định"""
+    return "—" if pd.isna(value) else f"{value:.2f}%"
+
+def read_price_history(source_path=PRICE_FILE):
+    """Đọc file giá ĐVĐT theo ngày, trả về bảng (ngày, giá) đã sắp xếp; báo LedgerError nếu lỗi"""
+    try:
+        content, _ = read_source(source_path)
+    except FileNotFoundError as e:
+        raise LedgerError(
+            f"Không tìm thấy tệp '{os.path.basename(source_path)}'",
+            hint="File giá gồm 2 cột: ngày (dd/mm/yyyy) và giá 1 ĐVĐT",
+        ) from e
+    df, _ = parse_csv_bytes(content)
+    if len(df.columns) < 2:
+        raise LedgerError(f"File giá ĐVĐT cần 2 cột (ngày, giá), nhưng chỉ có {len(df.columns)} cột")
+    
+    dates = pd.to_datetime(df.iloc[:, 0].astype(str).str.strip(), format='%d/%m/%Y', errors='coerce')
+    values, _ = parse_money(df.iloc[:, 1])
+    prices = pd.DataFrame({COL_DATE_DATETIME: dates, COL_NAV_PRICE: values})
+    prices = prices[dates.notna() & (values > 0)]
+    if prices.empty:
+        raise LedgerError("File giá ĐVĐT không có dòng hợp lệ")
+    # Một ngày có nhiều giá: lấy giá ghi sau cùng
+    prices = prices.sort_values(COL_DATE_DATETIME, kind='mergesort')
+    return prices.drop_duplicates(COL_DATE_DATETIME, keep='last').reset_index(drop=True)
+
+def ledger_price_history(id_index):
+    """Giá ĐVĐT theo ngày suy từ giá mua của các giao dịch (khi chưa có file giá)"""
+    sorted_df, _ = id_index
+    prices = pd.DataFrame({
+        COL_DATE_DATETIME: sorted_df[COL_DATE_DATETIME].to_numpy(),
+        COL_NAV_PRICE: sorted_df[COL_PRICE_DVDT_CLEAN].to_numpy(dtype=float),
+    })
+    prices = prices[prices[COL_DATE_DATETIME].notna() & (prices[COL_NAV_PRICE] > 0)]
+    return prices.drop_duplicates(COL_DATE_DATETIME, keep='last').reset_index(drop=True)
+
+def build_nav_snapshots(id_index, holders, prices, freq=NAV_SNAPSHOT_FREQ):
+    """NAV cuối mỗi kỳ của mọi cổ đông, từ một lần merge_asof cho toàn quỹ
+    
+    Lưới (cuối kỳ × cổ đông) được ghép as-of với các giao dịch đã sắp theo ngày
+    (by = cổ đông) để lấy tiền/ĐVĐT lũy kế tại cuối kỳ; giá tại cuối kỳ là giá gần nhất
+    không sau ngày đó. Kỳ cuối cùng là ngày có giá hoặc giao dịch mới nhất. Kết quả sắp
+    theo cổ đông rồi theo kỳ; các dòng của cổ đông thứ i nằm ở table[starts[i]:starts[i + 1]].
+    """
+    sorted_df, _ = id_index
+    codes = holders.index.get_indexer(normalize_id_series(sorted_df[COL_ID]))
+    dates = sorted_df[COL_DATE_DATETIME].to_numpy()
+    valid = (codes >= 0) & ~np.isnat(dates)
+    events = pd.DataFrame({
+        COL_PERIOD_END: dates[valid],
+        'code': codes[valid],
+        COL_CUM_MONEY: sorted_df[COL_CUM_MONEY].to_numpy()[valid],
+        COL_CUM_DVDT: sorted_df[COL_CUM_DVDT].to_numpy()[valid],
+    })
+    
+    n = len(holders)
+    price_dates = prices[COL_DATE_DATETIME].to_numpy()
+    if events.empty:
+        periods = pd.DatetimeIndex([])
+    else:
+        end = max(events[COL_PERIOD_END].iat[-1], pd.Timestamp(price_dates[-1]) if len(prices) else pd.NaT)
+        periods = pd.period_range(events[COL_PERIOD_END].iat[0], end, freq=freq).to_timestamp(how='end').normalize()
+        periods = periods[periods < end].append(pd.DatetimeIndex([end]))
+    
+    # Lưới đã sắp theo ngày (mỗi kỳ lặp lại cho mọi cổ đông), đúng yêu cầu của merge_asof
+    grid = pd.DataFrame({
+        COL_PERIOD_END: np.repeat(periods.to_numpy(), n),
+        'code': np.tile(np.arange(n), len(periods)),
+    })
+    table = pd.merge_asof(grid, events, on=COL_PERIOD_END, by='code', direction='backward')
+    # Bỏ các kỳ trước lần mua đầu tiên của mỗi cổ đông
+    table = table[table[COL_CUM_DVDT].notna()]
+    table[COL_CUM_MONEY] = table[COL_CUM_MONEY].astype('int64')
+    
+    period_prices = prices[COL_NAV_PRICE].to_numpy(dtype=float)
+    at = np.searchsorted(price_dates, table[COL_PERIOD_END].to_numpy(), side='right') - 1
+    table[COL_NAV_PRICE] = np.where(at >= 0, period_prices[np.maximum(at, 0)], np.nan)
+    table[COL_NAV] = table[COL_CUM_DVDT] * table[COL_NAV_PRICE]
+    table[COL_PNL] = table[COL_NAV] - table[COL_CUM_MONEY]
+    
+    table = table.sort_values('code', kind='stable')
+    codes = table.pop('code').to_numpy()
+    table.insert(0, COL_ID, pd.Categorical.from_codes(codes, categories=holders.index))
+    return {
+        'table': table.reset_index(drop=True),
+        'starts': np.searchsorted(codes, np.arange(n + 1)),
+        'holders': holders.index,
+        'periods': periods,
+        'prices': prices,
+    }
+
+def nav_snapshots(ledger, price_path=PRICE_FILE):
+    """NAV cuối kỳ của mọi cổ đông (build_nav_snapshots), nhớ sẵn trong dict sổ
+    
+    Dùng file giá `price_path` nếu có, ngược lại suy giá từ chính sổ giao dịch; chỉ dựng
+    lại khi file giá đổi (kích thước/mtime) hoặc sổ được nạp thêm (refresh_ledger).
+    """
+    try:
+        stat = os.stat(price_path)
+        version = f"{stat.st_size}-{stat.st_mtime_ns}"
+    except OSError:
+        version = 'ledger'
+    with ledger['lock']:
+        cached = ledger.get('nav_snapshots')
+        id_index, holders = ledger['index'], ledger['holders']
+        if cached is not None and cached['version'] == version:
+            perf_metrics.cache_event('nav_snapshots', hit=True)
+            return cached
+    
+    perf_metrics.cache_event('nav_snapshots', hit=False)
+    with perf_metrics.timed('nav.snapshots'):
+        prices = ledger_price_history(id_index) if version == 'ledger' else read_price_history(price_path)
+        snapshots = build_nav_snapshots(id_index, holders, prices)
+    snapshots['version'] = version
+    with ledger['lock']:
+        if ledger['index'] is id_index:
+            ledger['nav_snapshots'] = snapshots
+    return snapshots
+
+def holder_nav_history(snapshots, shareholder_id):
+    """NAV cuối mỗi kỳ của một cổ đông (bảng con của nav_snapshots), hoặc None nếu không có"""
+    try:
+        code = snapshots['holders'].get_loc(normalize_id(shareholder_id))
+    except KeyError:
+        return None
+    return snapshots['table'].iloc[snapshots['starts'][code]:snapshots['starts'][code + 1]]
+
+def period_snapshot(snapshots, period_end=None):
+    """NAV của mọi cổ đông tại một cuối kỳ (mặc định kỳ mới nhất), chỉ mục theo ID"""
+    periods = snapshots['periods']
+    if not len(periods):
+        return snapshots['table'].set_index(COL_ID)
+    target = periods[-1] if period_end is None else pd.Timestamp(period_end)
+    # Ngày bất kỳ: lấy cuối kỳ gần nhất không sau ngày đó
+    target = periods[max(periods.searchsorted(target, side='right') - 1, 0)]
+    table = snapshots['table']
+    return table[table[COL_PERIOD_END] == target].set_index(COL_ID)
+
+def build_export_tables(shareholder_data, shareholder_name, price=None, returns=None):
+    """Chuẩn bị bảng lịch sử giao dịch và bảng tổng kết cho báo cáo
+    
+    Có `price` thì bảng tổng kết thêm NAV ở giá đó; có `returns` (dòng của batch_returns)
+    thì thêm XIRR và TWR.
+    """
+    # Chuẩn bị dữ liệu export
+    export_data = shareholder_data[[COL_DATE, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_BANK]].copy()
+    export_data.columns = ['Ngày chuyển tiền', 'Số tiền (VNĐ)', 'Giá ĐVĐT (VNĐ)', 'Số ĐVĐT', 'Ngân hàng']
+    
+    # Thêm thông tin tổng kết
+    total_investment = shareholder_data[COL_TOTAL_MONEY_CLEAN].sum()
+    total_dvdt = shareholder_data[COL_QUANTITY_DVDT_CLEAN].sum()
+    
+    labels = ['Tên cổ đông', 'Tổng số tiền đầu tư (VNĐ)', 'Tổng số ĐVĐT sở hữu', 'Số lần giao dịch']
+    values = [shareholder_name, f"{total_investment:,.0f}", f"{total_dvdt:,.0f}", len(shareholder_data)]
+    if price is not None:
+        labels += ['Giá ĐVĐT định giá (VNĐ)', 'NAV (VNĐ)']
+        values += [f"{price:,.0f}", f"{total_dvdt * price:,.0f}"]
+    if returns is not None:
+        labels += ['XIRR (%/năm)', 'TWR (%)', 'TWR (%/năm)']
+        values += [format_percent(returns[col]) for col in RETURN_METRICS]
+    
+    summary_data = pd.DataFrame({'Thông tin': labels, 'Giá trị': values})
+    return export_data, summary_data
+
+def excel_engine():
+    """Chọn thư viện ghi Excel: xlsxwriter (nhanh hơn) nếu có, ngược lại openpyxl"""
+    try:
+        import xlsxwriter  # noqa: F401
+        return 'xlsxwriter'
+    except ImportError:
+        return 'openpyxl'
+
+def create_download_data(shareholder_data, shareholder_name, file_format='xlsx', price=None, returns=None):
+    """Tạo dữ liệu để download (Excel gồm 2 sheet, hoặc CSV chỉ gồm lịch sử giao dịch)"""
+    export_data, summary_data = build_export_tables(shareholder_data, shareholder_name, price, returns)
+    
+    if file_format == 'csv':
+        # utf-8-sig để Excel mở đúng tiếng Việt
+        return export_data.to_csv(index=False).encode('utf-8-sig')
+    
+    # Tạo buffer để ghi Excel
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine=excel_engine()) as writer:
+        export_data.to_excel(writer, sheet_name='Lịch sử giao dịch', index=False)
+        summary_data.to_excel(writer, sheet_name='Tổng kết', index=False)
+    
+    return buffer.getvalue()
+
+def report_file_name(shareholder_id, file_format='xlsx'):
+    """Tên file báo cáo của một cổ đông (theo ngày tạo)"""
+    return f"Bao_cao_dau_tu_{shareholder_id}_{datetime.now().strftime('%Y%m%d')}.{file_format}"
+
+def new_report_cache():
+    """Bộ nhớ đệm báo cáo (LRU), giới hạn theo tổng dung lượng"""
+    return {'entries': OrderedDict(), 'size': 0, 'lock': threading.Lock()}
+
+def get_report(cache, key, build):
+    """Lấy báo cáo theo key (ID, phiên bản dữ liệu, định dạng); chỉ tạo khi chưa có
+    
+    Khi vượt REPORT_CACHE_MAX_BYTES, bỏ các báo cáo dùng lâu nhất trước (LRU).
+    """
+    with cache['lock']:
+        if key in cache['entries']:
+            cache['entries'].move_to_end(key)
+            perf_metrics.cache_event('report', hit=True)
+            return cache['entries'][key]
+    
+    perf_metrics.cache_event('report', hit=False)
+    with perf_metrics.timed('report.build'):
+        data = build()
+    with cache['lock']:
+        if key not in cache['entries']:
+            cache['entries'][key] = data
+            cache['size'] += len(data)
+        while cache['size'] > REPORT_CACHE_MAX_BYTES and len(cache['entries']) > 1:
+            _, evicted = cache['entries'].popitem(last=False)
+            cache['size'] -= len(evicted)
+    return data
+
+def holder_frame(total_investment, total_dvdt):
+    """Bảng tổng hợp một dòng cho một cổ đông (đầu vào của batch_nav)"""
+    return pd.DataFrame({COL_TOTAL_MONEY_CLEAN: [total_investment], COL_QUANTITY_DVDT_CLEAN: [total_dvdt]})
+
+def lttb_indices(x, y, n_out):
+    """Chọn `n_out` điểm giữ dáng đường (Largest-Triangle-Three-Buckets), luôn giữ điểm đầu và cuối"""
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+    # n_out - 2 nhóm điểm ở giữa; mỗi nhóm chọn điểm tạo tam giác lớn nhất với điểm vừa chọn
+    # và trung bình của nhóm sau
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def chart_series(history, max_points=CHART_MAX_POINTS):
+    """Dữ liệu biểu đồ lịch sử của một cổ đông, tối đa `max_points` điểm dù lịch sử dài bao nhiêu
+    
+    Chỉ giữ CHART_COLUMNS. Lịch sử dài được gộp theo ngày rồi giảm điểm bằng LTTB trên
+    đường tiền lũy kế; khi đó tiền/ĐVĐT mua thêm của mỗi điểm là phần tăng so với điểm
+    trước và giá là giá mua bình quân của phần đó.
+    """
+    data = history[CHART_COLUMNS]
+    if len(data) <= max_points:
+        return data.reset_index(drop=True)
+    
+    # Lũy kế trước giao dịch đầu tiên (khác 0 nếu lịch sử không bắt đầu từ đầu sổ)
+    start_money = data[COL_CUM_MONEY].iat[0] - data[COL_TOTAL_MONEY_CLEAN].iat[0]
+    start_dvdt = data[COL_CUM_DVDT].iat[0] - data[COL_QUANTITY_DVDT_CLEAN].iat[0]
+    # Nhiều giao dịch cùng ngày: giữ lũy kế cuối ngày
+    data = data.groupby(COL_DATE_DATETIME, sort=True).last().reset_index()
+    days = (data[COL_DATE_DATETIME] - data[COL_DATE_DATETIME].iat[0]).dt.days.to_numpy(dtype=float)
+    keep = lttb_indices(days, data[COL_CUM_MONEY].to_numpy(dtype=float), max_points)
+    data = data.iloc[keep].reset_index(drop=True)
+    
+    cum_money = data[COL_CUM_MONEY].to_numpy()
+    cum_dvdt = data[COL_CUM_DVDT].to_numpy()
+    added_money = np.diff(cum_money, prepend=start_money)
+    added_dvdt = np.diff(cum_dvdt, prepend=start_dvdt)
+    data[COL_TOTAL_MONEY_CLEAN] = added_money
+    data[COL_QUANTITY_DVDT_CLEAN] = added_dvdt
+    data[COL_PRICE_DVDT_CLEAN] = np.divide(
+        added_money.astype(float), added_dvdt, out=np.zeros(len(data)), where=added_dvdt > 0
+    )
+    return data
+
+def format_date(value):
+    """Ngày dạng ISO cho JSON (None nếu trống)"""
+    return None if pd.isna(value) else value.strftime('%Y-%m-%d')
+
+def shareholder_record(ledger, shareholder_id, price=None, include_history=False, include_returns=False):
+    """Thông tin một cổ đông dạng dict ghi được ra JSON, hoặc None nếu không tìm thấy
+    
+    `include_returns` (cần `price`) thêm XIRR/TWR, lấy từ bảng lợi suất cả quỹ (fund_returns).
+    """
+    summary = lookup_summary(ledger['holders'], shareholder_id)
+    if summary is None:
+        return None
+    total_investment = int(summary[COL_TOTAL_MONEY_CLEAN])
+    total_dvdt = float(summary[COL_QUANTITY_DVDT_CLEAN])
+    record = {
+        'id': normalize_id(shareholder_id),
+        'found': True,
+        'shareholder': str(summary[COL_SHAREHOLDER]),
+        'total_investment': total_investment,
+        'total_dvdt': total_dvdt,
+        'transactions': int(summary[COL_TX_COUNT]),
+        'first_date': format_date(summary[COL_FIRST_DATE]),
+        'last_date': format_date(summary[COL_LAST_DATE]),
+    }
+    
+    if price is not None:
+        # Một cổ đông, một mức giá: cùng công thức với batch_nav nhưng tính trên số vô hướng
+        nav = total_dvdt * float(price)
+        record.update({
+            'price': float(price),
+            'nav': nav,
+            'pnl': nav - total_investment,
+            'performance': calculate_performance(nav, total_investment),
+        })
+        if include_returns:
+            returns = fund_returns(ledger, price)
+            row = returns.index.get_loc(record['id'])
+            for key, col in (('xirr', COL_XIRR), ('twr', COL_TWR), ('twr_annual', COL_TWR_ANNUAL)):
+                value = returns[col].iat[row]
+                record[key] = None if np.isnan(value) else float(value)
+    
+    if include_history:
+        sorted_df, positions = ledger['index']
+        rows = positions.get(record['id'], [])
+        # Lấy thẳng từ mảng của từng cột, không tạo DataFrame con cho mỗi request
+        columns = [sorted_df[col].to_numpy()[rows] for col in (
+            COL_DATE_DATETIME, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN,
+            COL_BANK, COL_CUM_MONEY, COL_CUM_DVDT, COL_AVG_PRICE,
+        )]
+        columns[0] = np.datetime_as_string(columns[0], unit='D')
+        record['history'] = [
+            {
+                'date': None if date == 'NaT' else date,
+                'amount': int(amount),
+                'price': float(unit_price),
+                'dvdt': float(dvdt),
+                'bank': None if pd.isna(bank) else str(bank),
+                'cumulative_investment': int(cum_money),
+                'cumulative_dvdt': float(cum_dvdt),
+                'average_price': float(avg_price),
+            }
+            for date, amount, unit_price, dvdt, bank, cum_money, cum_dvdt, avg_price in zip(*columns)
+        ]
+    return record
+
+def main(argv=None):
+    """Tra cứu hàng loạt: đọc ID từ tham số hoặc stdin, ghi mỗi cổ đông một dòng JSON"""
+    parser = argparse.ArgumentParser(description="Tra cứu thông tin cổ đông không cần giao diện (JSON lines).")
+    parser.add_argument('ids', nargs='*', help="ID cổ đông; bỏ trống để đọc từ stdin (mỗi dòng một ID)")
+    parser.add_argument('--price', type=float, help="Giá ĐVĐT để tính NAV, lãi/lỗ và hiệu suất")
+    parser.add_argument('--history', action='store_true', help="Kèm lịch sử giao dịch")
+    parser.add_argument('--returns', action='store_true', help="Kèm XIRR và TWR (cần --price)")
+    parser.add_argument('--source', default=DATA_FILE, help=f"File CSV nguồn (mặc định: {DATA_FILE})")
+    parser.add_argument('--check', action='store_true', help="Chỉ kiểm tra chất lượng dữ liệu (JSON lines)")
+    args = parser.parse_args(argv)
+    if args.returns and args.price is None:
+        parser.error("--returns cần --price")
+    
+    try:
+        ledger = open_ledger(args.source)
+    except LedgerError as e:
+        print(f"Lỗi: {e}", file=sys.stderr)
+        return 1
+    
+    if args.check:
+        # Dòng đầu là số dòng có vấn đề theo từng mục, sau đó mỗi giao dịch có vấn đề một dòng
+        issues = ledger_issues(ledger)
+        sys.stdout.write(json.dumps({'transactions': issues['transactions'], 'issues': issues['counts']}) + '\n')
+        rows = issues['rows']
+        flags = rows[list(ISSUE_CHECKS.values())].to_numpy()
+        for i in range(len(rows)):
+            record = {
+                'date': str(rows[COL_DATE].iat[i]),
+                'id': str(rows[COL_ID].iat[i]),
+                'amount': int(rows[COL_TOTAL_MONEY_CLEAN].iat[i]),
+                'price': float(rows[COL_PRICE_DVDT_CLEAN].iat[i]),
+                'dvdt': float(rows[COL_QUANTITY_DVDT_CLEAN].iat[i]),
+                'issues': [key for key, flagged in zip(ISSUE_CHECKS, flags[i]) if flagged],
+            }
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return 0
+    
+    ids = args.ids or (line.strip() for line in sys.stdin)
+    for shareholder_id in ids:
+        if not shareholder_id:
+            continue
+        record = shareholder_record(ledger, shareholder_id, args.price, args.history, args.returns)
+        if record is None:
+            record = {'id': normalize_id(shareholder_id), 'found': False}
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
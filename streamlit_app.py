@@ -1,10 +1,28 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime
-import re
-import io
 import altair as alt
+import hmac
+import json
+import os
+
+import perf_metrics
+
+from shareholder_core import (
+    COL_AVG_PRICE, COL_BANK, COL_CUM_DVDT, COL_CUM_MONEY, COL_DATE, COL_DATE_DATETIME,
+    COL_FIRST_DATE, COL_ID, COL_LAST_DATE, COL_NAV, COL_NAV_PRICE,
+    COL_PERIOD_END, COL_PNL, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_SHAREHOLDER,
+    COL_TOTAL_MONEY_CLEAN, COL_TWR, COL_TWR_ANNUAL, COL_TX_COUNT, COL_XIRR, CHART_MAX_POINTS,
+    DEFAULT_PRICE, ISSUE_CHECKS, PRICE_FILE, RAW_COLUMNS, REPORT_FORMATS, WHATIF_PRICE_STEP,
+    LedgerError,
+    build_suggestion_index, calculate_performance, chart_series, create_download_data,
+    format_currency, format_percent, fund_returns, get_report, holder_nav_history,
+    ledger_issues, lookup_shareholder, lookup_summary, mask_id, nav_snapshots, new_report_cache,
+    normalize_id, refresh_ledger, report_file_name, suggest_ids,
+)
+from ledger_store import load_shared_ledger, publish_ledger, store_version
+
+# Bảng hiệu năng chỉ hiện khi URL có ?admin=<giá trị của biến môi trường này>
+ADMIN_TOKEN_ENV = "SHAREHOLDER_ADMIN_TOKEN"
 
 # Cấu hình trang
 st.set_page_config(
@@ -13,165 +31,277 @@ st.set_page_config(
     layout="wide"
 )
 
-# ======================== CONSTANTS ========================
-# Định nghĩa hằng số cho các tên cột
-COL_DATE = "Ngày"
-COL_TOTAL_MONEY = " Tổng "  # Note: has leading and trailing spaces
-COL_DECREASE = " Giảm "  # Note: has leading and trailing spaces
-COL_BALANCE = " Số dư "  # Note: has leading and trailing spaces
-COL_CATEGORY = "Phân loại"
-COL_BANK = "Ngân hàng"
-COL_ACCOUNT = "STK"
-COL_SHAREHOLDER = "Shareholder"
-COL_ID = "ID"
-COL_PRICE_DVDT = " Giá 1 ĐVĐT "  # Note: has leading and trailing spaces
-COL_QUANTITY_DVDT = " Số lượng ĐVĐT "  # Note: has leading and trailing spaces
-COL_CONTENT = "Content"
+def show_ledger_error(error):
+    """Hiển thị lỗi đọc dữ liệu từ shareholder_core"""
+    st.error(f"❌ **Lỗi:** {error}")
+    if error.hint:
+        st.info(f"💡 {error.hint}")
 
-# Tên cột sau khi làm sạch
-COL_TOTAL_MONEY_CLEAN = "Tổng_tiền_clean"
-COL_PRICE_DVDT_CLEAN = "Giá_ĐVĐT_clean"
-COL_QUANTITY_DVDT_CLEAN = "Số_lượng_ĐVĐT_clean"
-COL_DATE_DATETIME = "Ngày_datetime"
+def warn_data_issues(ledger):
+    """Kiểm tra chất lượng dữ liệu khi nạp sổ, cảnh báo số giao dịch có vấn đề theo từng mục"""
+    counts = ledger_issues(ledger)['counts']
+    problems = [f"{ISSUE_CHECKS[key]}: {n:,} dòng" for key, n in counts.items() if n]
+    if problems:
+        st.warning(f"⚠️ **Cảnh báo dữ liệu:** {' · '.join(problems)}")
 
-@st.cache_data
-def load_data():
-    """Đọc và xử lý dữ liệu từ file CSV"""
+@st.cache_resource
+def load_ledger():
+    """Sổ giao dịch dùng chung cho mọi phiên: gắn vào kho dùng chung giữa các process
+    (memory-map, không sao chép), chỉ đọc CSV khi kho chưa có bản khớp với file"""
+    perf_metrics.cache_event('ledger', hit=False)
     try:
-        # Đọc file với encoding phù hợp
-        try:
-            df = pd.read_csv('data_shareholders.csv', encoding='utf-8-sig')
-        except:
-            try:
-                df = pd.read_csv('data_shareholders.csv', encoding='cp1252')
-            except:
-                df = pd.read_csv('data_shareholders.csv', encoding='latin-1')
-        
-        # Kiểm tra xem DataFrame có dữ liệu không
-        if df.empty:
-            st.error("❌ **Lỗi:** File CSV không có dữ liệu")
-            return None
-        
-        # Kiểm tra số cột
-        if len(df.columns) < 9:
-            st.error(f"❌ **Lỗi:** File CSV không đủ cột. Cần ít nhất 9 cột, nhưng chỉ có {len(df.columns)} cột")
-            return None
-        
-        # Lọc chỉ lấy các dòng giao dịch chính (bỏ qua các dòng chi tiết)
-        # Dòng giao dịch chính có đầy đủ thông tin trong các cột
-        try:
-            mask = (
-                df.iloc[:, 0].notna() &  # Ngày
-                df.iloc[:, 1].notna() &  # Tổng tiền
-                df.iloc[:, 7].notna() &  # Shareholder
-                df.iloc[:, 8].notna() &  # ID
-                ~df.iloc[:, 0].astype(str).str.startswith('-')  # Không bắt đầu bằng dấu -
-            )
-            
-            main_transactions = df[mask].copy()
-            
-            # Kiểm tra xem có dữ liệu sau khi lọc không
-            if main_transactions.empty:
-                st.error("❌ **Lỗi:** Không tìm thấy dữ liệu giao dịch hợp lệ trong file CSV")
-                st.info("💡 Vui lòng kiểm tra lại định dạng dữ liệu trong file CSV")
-                return None
-                
-        except Exception as e:
-            st.error(f"❌ **Lỗi khi lọc dữ liệu:** {e}")
-            return None
+        ledger = load_shared_ledger()
+    except LedgerError as e:
+        show_ledger_error(e)
+        return None
+    warn_data_issues(ledger)
+    return ledger
+
+def current_ledger():
+    """Sổ giao dịch mới nhất: gắn lại khi process khác đã công bố phiên bản mới vào kho"""
+    # load_ledger chỉ chạy thân hàm (và đếm trượt) khi chưa có trong cache
+    misses = perf_metrics.counter('cache.ledger.miss')
+    ledger = load_ledger()
+    if perf_metrics.counter('cache.ledger.miss') == misses:
+        perf_metrics.cache_event('ledger', hit=True)
+    if ledger is not None and ledger['version'] is not None:
+        version = store_version()
+        if version is not None and version != ledger['version']:
+            load_ledger.clear()
+            ledger = load_ledger()
+    return ledger
+
+def load_data():
+    """Bảng giao dịch đã làm sạch (bản memory-map trong kho dùng chung, không sao chép)"""
+    ledger = current_ledger()
+    return None if ledger is None else ledger['index'][0]
+
+@st.cache_resource(max_entries=1)
+def load_suggestion_index(data_version, _ids):
+    """Chỉ mục trigram của các ID cho phiên bản dữ liệu hiện tại (dựng lại khi dữ liệu đổi)"""
+    return build_suggestion_index(_ids)
+
+@st.cache_resource
+def load_report_cache():
+    """Bộ nhớ đệm báo cáo dùng chung cho mọi phiên, giới hạn theo tổng dung lượng"""
+    return new_report_cache()
+
+@st.cache_data(max_entries=1000)
+def history_chart_specs(data_version, shareholder_id, _shareholder_data):
+    """Spec Vega-Lite của hai biểu đồ lịch sử, tính một lần cho mỗi ID và phiên bản dữ liệu
+    
+    Chỉ gửi các cột cần vẽ và tối đa CHART_MAX_POINTS điểm mỗi biểu đồ (xem chart_series).
+    """
+    # Trúng cache thì hàm không chạy: chỉ ghi lần trượt, lần trúng suy ra từ số lần vẽ
+    perf_metrics.cache_event('chart_spec', hit=False)
+    with perf_metrics.timed('chart_spec'):
+        chart_data = chart_series(_shareholder_data)
         
-        # Đặt tên cột chuẩn - sử dụng tên cột thực tế từ CSV
-        try:
-            main_transactions.columns = [
-                "Ngày", " Tổng ", " Giảm ", " Số dư ", "Phân loại", 
-                "Ngân hàng", "STK", "Shareholder", "ID", 
-                " Giá 1 ĐVĐT ", " Số lượng ĐVĐT ", "Content"
+        chart_invest = alt.Chart(chart_data).mark_line(
+            point=alt.OverlayMarkDef(filled=False, fill="white", size=50),
+            strokeWidth=3,
+            color='#1f77b4'
+        ).encode(
+            x=alt.X(f'{COL_DATE_DATETIME}:T', title='Ngày', axis=alt.Axis(format='%d/%m')),
+            y=alt.Y(f'{COL_CUM_MONEY}:Q', title='Tổng tiền đầu tư (VNĐ)', axis=alt.Axis(format=',.0f')),
+            tooltip=[
+                alt.Tooltip(f'{COL_DATE_DATETIME}:T', title='Ngày giao dịch', format='%d/%m/%Y'),
+                alt.Tooltip(f'{COL_TOTAL_MONEY_CLEAN}:Q', title='Tiền đầu tư thêm', format=',.0f'),
+                alt.Tooltip(f'{COL_CUM_MONEY}:Q', title='Tổng tiền tích lũy', format=',.0f'),
+                alt.Tooltip(f'{COL_AVG_PRICE}:Q', title='Giá mua trung bình', format=',.0f')
             ]
-        except Exception as e:
-            st.error(f"❌ **Lỗi khi đặt tên cột:** {e}")
-            return None
+        ).interactive()
         
-        # Làm sạch dữ liệu
-        def clean_money(value):
-            """Chuyển đổi giá trị tiền tệ sang số"""
-            if pd.isna(value):
-                return 0
-            value_str = str(value).replace(',', '').replace(' ', '').replace('"', '')
-            try:
-                return float(value_str)
-            except:
-                return 0
-        
-        try:
-            main_transactions[COL_TOTAL_MONEY_CLEAN] = main_transactions[" Tổng "].apply(clean_money)
-            main_transactions[COL_PRICE_DVDT_CLEAN] = main_transactions[" Giá 1 ĐVĐT "].apply(clean_money)
-            main_transactions[COL_QUANTITY_DVDT_CLEAN] = main_transactions[" Số lượng ĐVĐT "].apply(clean_money)
-            
-            # Chuyển đổi ngày
-            main_transactions[COL_DATE_DATETIME] = pd.to_datetime(main_transactions["Ngày"], format='%d/%m/%Y', errors='coerce')
-            
-        except Exception as e:
-            st.error(f"❌ **Lỗi khi xử lý dữ liệu:** {e}")
-            return None
-        
-        return main_transactions
+        chart_units = alt.Chart(chart_data).mark_line(
+            point=alt.OverlayMarkDef(filled=False, fill="white", size=50),
+            strokeWidth=3,
+            color='#ff7f0e'
+        ).encode(
+            x=alt.X(f'{COL_DATE_DATETIME}:T', title='Ngày', axis=alt.Axis(format='%d/%m')),
+            y=alt.Y(f'{COL_CUM_DVDT}:Q', title='Tổng ĐVĐT sở hữu', axis=alt.Axis(format=',.1f')),
+            tooltip=[
+                alt.Tooltip(f'{COL_DATE_DATETIME}:T', title='Ngày giao dịch', format='%d/%m/%Y'),
+                alt.Tooltip(f'{COL_PRICE_DVDT_CLEAN}:Q', title='Giá tại ngày mua', format=',.0f'),
+                alt.Tooltip(f'{COL_QUANTITY_DVDT_CLEAN}:Q', title='ĐVĐT mua thêm', format=',.3f'),
+                alt.Tooltip(f'{COL_CUM_DVDT}:Q', title='Tổng ĐVĐT tích lũy', format=',.3f'),
+                alt.Tooltip(f'{COL_AVG_PRICE}:Q', title='Giá mua trung bình', format=',.0f')
+            ]
+        ).interactive()
+        return chart_invest.to_dict(), chart_units.to_dict()
+
+@st.cache_data(max_entries=1000)
+def nav_chart_spec(data_version, price_version, shareholder_id, _nav_history):
+    """Spec Vega-Lite của biểu đồ NAV theo thời gian, tính một lần cho mỗi ID, phiên bản dữ liệu và file giá"""
+    perf_metrics.cache_event('chart_spec', hit=False)
+    with perf_metrics.timed('chart_spec'):
+        chart_data = pd.DataFrame({
+            'Cuối kỳ': _nav_history[COL_PERIOD_END].to_numpy(),
+            'NAV': _nav_history[COL_NAV].to_numpy(),
+            'Tổng tiền đầu tư': _nav_history[COL_CUM_MONEY].to_numpy(),
+            'Giá ĐVĐT': _nav_history[COL_NAV_PRICE].to_numpy(),
+            'Lãi/lỗ': _nav_history[COL_PNL].to_numpy(),
+        })
         
-    except FileNotFoundError:
-        st.error("❌ **Lỗi:** Không tìm thấy tệp 'data_shareholders.csv'")
-        st.info("💡 Vui lòng đảm bảo tệp dữ liệu nằm cùng thư mục với ứng dụng")
-        return None
-    except Exception as e:
-        st.error(f"❌ **Lỗi không xác định:** {e}")
-        return None
+        chart_nav = alt.Chart(chart_data).transform_fold(
+            ['NAV', 'Tổng tiền đầu tư'], as_=['Chỉ số', 'Giá trị']
+        ).mark_line(
+            point=alt.OverlayMarkDef(filled=False, fill="white", size=50),
+            strokeWidth=3
+        ).encode(
+            x=alt.X('Cuối kỳ:T', title='Cuối kỳ', axis=alt.Axis(format='%m/%Y')),
+            y=alt.Y('Giá trị:Q', title='VNĐ', axis=alt.Axis(format=',.0f')),
+            color=alt.Color(
+                'Chỉ số:N', title=None,
+                scale=alt.Scale(domain=['NAV', 'Tổng tiền đầu tư'], range=['#2ca02c', '#1f77b4'])
+            ),
+            tooltip=[
+                alt.Tooltip('Cuối kỳ:T', title='Cuối kỳ', format='%d/%m/%Y'),
+                alt.Tooltip('Giá ĐVĐT:Q', title='Giá ĐVĐT', format=',.0f'),
+                alt.Tooltip('NAV:Q', title='NAV', format=',.0f'),
+                alt.Tooltip('Tổng tiền đầu tư:Q', title='Tổng tiền đầu tư', format=',.0f'),
+                alt.Tooltip('Lãi/lỗ:Q', title='Lãi/lỗ', format=',.0f')
+            ]
+        ).interactive()
+        return chart_nav.to_dict()
 
-def format_currency(amount):
-    """Format số tiền theo định dạng Việt Nam"""
-    return f"{amount:,.0f}".replace(',', '.')
+def current_nav_snapshots(ledger):
+    """NAV cuối kỳ của mọi cổ đông (tính sẵn một lần cho mỗi phiên bản sổ và file giá), None nếu file giá lỗi"""
+    try:
+        return nav_snapshots(ledger)
+    except LedgerError as e:
+        st.warning(f"⚠️ **Không đọc được file giá ĐVĐT:** {e}")
+        if e.hint:
+            st.info(f"💡 {e.hint}")
+        return None
 
-def calculate_performance(nav, investment):
-    """Tính hiệu suất đầu tư với xử lý lỗi chia cho 0"""
-    if investment > 0:
-        return (nav / investment - 1) * 100
+def is_admin():
+    """Người xem có phải quản trị không (URL có ?admin=<SHAREHOLDER_ADMIN_TOKEN>)"""
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    if not token:
+        return False
+    if hasattr(st, 'query_params'):
+        value = st.query_params.get('admin')
     else:
-        return 0
+        value = st.experimental_get_query_params().get('admin', [None])[0]
+    return hmac.compare_digest(str(value or ''), token)
+
+def render_metrics_panel():
+    """Bảng thời gian từng công đoạn trong sidebar (chỉ quản trị, khi đã bật SHAREHOLDER_METRICS)"""
+    if not perf_metrics.enabled() or not is_admin():
+        return
+    metrics = perf_metrics.snapshot()
+    with st.sidebar.expander("⏱️ Hiệu năng (admin)"):
+        if metrics['stages']:
+            st.dataframe(pd.DataFrame.from_dict(metrics['stages'], orient='index'), use_container_width=True)
+        else:
+            st.caption("Chưa có số liệu")
+        for name, stats in metrics['caches'].items():
+            st.caption(f"Cache `{name}`: {stats['hit']} trúng / {stats['miss']} trượt")
+        st.download_button(
+            "📥 Tải số liệu (JSON)",
+            data=json.dumps(metrics, ensure_ascii=False, indent=2),
+            file_name=f"metrics_{metrics['pid']}.json",
+            mime="application/json"
+        )
+        if st.button("🗑️ Xóa số liệu"):
+            perf_metrics.reset()
+
+def render_issues_panel(ledger):
+    """Danh sách giao dịch có vấn đề trong sidebar (chỉ quản trị: có thông tin của mọi cổ đông)"""
+    if not is_admin():
+        return
+    issues = ledger_issues(ledger)
+    with st.sidebar.expander("🧪 Chất lượng dữ liệu (admin)"):
+        for key, label in ISSUE_CHECKS.items():
+            st.caption(f"{label}: {issues['counts'][key]:,} / {issues['transactions']:,} dòng")
+        if issues['rows'].empty:
+            st.success("✅ Không phát hiện vấn đề")
+            return
+        st.dataframe(issues['rows'], use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Tải danh sách (CSV)",
+            data=issues['rows'].to_csv(index=False).encode('utf-8-sig'),
+            file_name="kiem_tra_du_lieu.csv",
+            mime="text/csv"
+        )
 
-def create_download_data(shareholder_data, shareholder_name):
-    """Tạo dữ liệu để download"""
-    # Chuẩn bị dữ liệu export
-    export_data = shareholder_data[[COL_DATE, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_BANK]].copy()
-    export_data.columns = ['Ngày chuyển tiền', 'Số tiền (VNĐ)', 'Giá ĐVĐT (VNĐ)', 'Số ĐVĐT', 'Ngân hàng']
+# st.fragment cần Streamlit >= 1.37 (xem requirements.txt)
+@st.fragment
+@perf_metrics.timed('page.whatif')
+def render_whatif_panel(total_investment, total_dvdt, base_price, base_nav, base_performance):
+    """Khung mô phỏng What-if; kéo thanh trượt chỉ chạy lại khung này, không chạy lại cả trang"""
+    st.subheader("🎯 Mô phỏng What-if")
+    st.markdown("*Thay đổi giá để xem NAV khác nhau:*")
     
-    # Thêm thông tin tổng kết
-    total_investment = shareholder_data[COL_TOTAL_MONEY_CLEAN].sum()
-    total_dvdt = shareholder_data[COL_QUANTITY_DVDT_CLEAN].sum()
+    # Slider cho tính năng What-if
+    min_price = max(1000, base_price * 0.5)
+    max_price = base_price * 2
     
-    summary_data = pd.DataFrame({
-        'Thông tin': ['Tên cổ đông', 'Tổng số tiền đầu tư (VNĐ)', 'Tổng số ĐVĐT sở hữu', 'Số lần giao dịch'],
-        'Giá trị': [shareholder_name, f"{total_investment:,.0f}", f"{total_dvdt:,.0f}", len(shareholder_data)]
-    })
+    whatif_price = st.slider(
+        "Giá ĐVĐT giả định (VNĐ):",
+        min_value=int(min_price),
+        max_value=int(max_price),
+        value=int(base_price),
+        step=WHATIF_PRICE_STEP,
+        format="%d",
+        help="Kéo thanh trượt để xem NAV thay đổi real-time",
+        key="whatif_slider"  # Thêm key để tránh conflict
+    )
+    
+    # Một mức giá: tính thẳng trên số vô hướng, không cần bảng dựng sẵn cho cả dải giá
+    whatif_nav = total_dvdt * whatif_price
+    whatif_performance = calculate_performance(whatif_nav, total_investment)
+    nav_difference = whatif_nav - base_nav
+    performance_difference = whatif_performance - base_performance
     
-    # Tạo buffer để ghi Excel
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        export_data.to_excel(writer, sheet_name='Lịch sử giao dịch', index=False)
-        summary_data.to_excel(writer, sheet_name='Tổng kết', index=False)
+    # Hiển thị kết quả What-if
+    st.markdown("**🔮 Kết quả mô phỏng:**")
+    
+    st.metric(
+        label="NAV giả định",
+        value=f"{format_currency(whatif_nav)} VNĐ",
+        delta=f"{format_currency(nav_difference)} VNĐ"
+    )
     
-    return buffer.getvalue()
+    st.metric(
+        label="Hiệu suất giả định",
+        value=f"{whatif_performance:.2f}%",
+        delta=f"{performance_difference:.2f}%"
+    )
+    
+    # Hiển thị bảng so sánh
+    st.markdown("**📊 Bảng so sánh:**")
+    comparison_data = pd.DataFrame({
+        'Chỉ số': ['Giá ĐVĐT', 'NAV', 'Hiệu suất'],
+        'Hiện tại': [
+            f"{format_currency(base_price)} VNĐ",
+            f"{format_currency(base_nav)} VNĐ", 
+            f"{base_performance:.2f}%"
+        ],
+        'Giả định': [
+            f"{format_currency(whatif_price)} VNĐ",
+            f"{format_currency(whatif_nav)} VNĐ",
+            f"{whatif_performance:.2f}%"
+        ]
+    })
+    st.dataframe(comparison_data, use_container_width=True, hide_index=True)
 
+@perf_metrics.timed('page.total')
 def main():
     st.title("🏦 Hệ thống Tra cứu Thông tin Cổ đông")
     st.markdown("---")
     
-    # Tải dữ liệu
-    df = load_data()
-    if df is None:
+    # Tải dữ liệu (sổ giao dịch dùng chung cho mọi phiên)
+    ledger = current_ledger()
+    if ledger is None:
         st.error("❌ **Lỗi:** Không thể tải được file dữ liệu. Vui lòng kiểm tra lại file `data_shareholders.csv` và đảm bảo tên cột đã chính xác.")
         st.info("💡 **Các bước kiểm tra:**")
         st.info("1. Đảm bảo file `data_shareholders.csv` tồn tại trong thư mục")
         st.info("2. Kiểm tra định dạng CSV có đúng không")
-        st.info("3. Đảm bảo file có ít nhất 9 cột dữ liệu")
+        st.info(f"3. Đảm bảo file có đủ {len(RAW_COLUMNS)} cột dữ liệu theo đúng thứ tự của file mẫu")
         st.info("4. Kiểm tra encoding của file (UTF-8, CP1252, hoặc Latin-1)")
         st.stop()
+    df = ledger['index'][0]
     
     # Kiểm tra bổ sung: đảm bảo DataFrame có dữ liệu và các cột cần thiết
     if df.empty:
@@ -196,14 +326,20 @@ def main():
         help="Họ tên viết liền không dấu + 6-8 số cuối STK"
     ).upper()
     
-    # Nhập giá ĐVĐT hiện tại
+    # Nhập giá ĐVĐT hiện tại (mặc định là giá mới nhất trong file giá, nếu có)
+    snapshots = current_nav_snapshots(ledger)
+    default_price, price_help = DEFAULT_PRICE, "Nhập giá trị ĐVĐT hiện tại để tính NAV"
+    if snapshots is not None and snapshots['version'] != 'ledger':
+        latest = snapshots['prices'].iloc[-1]
+        default_price = float(latest[COL_NAV_PRICE])
+        price_help += f" (mặc định: giá ngày {latest[COL_DATE_DATETIME].strftime('%d/%m/%Y')} trong `{PRICE_FILE}`)"
     current_price = st.sidebar.number_input(
         "Giá ĐVĐT hiện tại (VNĐ):",
         min_value=0.0,
-        value=10000.0,
+        value=default_price,
         step=100.0,
         format="%.0f",
-        help="Nhập giá trị ĐVĐT hiện tại để tính NAV"
+        help=price_help
     )
     
     # Nút tra cứu
@@ -212,8 +348,28 @@ def main():
     # Nút làm mới dữ liệu
     st.sidebar.markdown("---")
     if st.sidebar.button("🔄 Làm mới dữ liệu", help="Tải lại dữ liệu mới nhất từ file"):
-        st.cache_data.clear()
-        st.rerun()
+        # Chỉ nạp thêm các dòng mới ở cuối file, giữ nguyên cache của các phiên khác
+        with perf_metrics.timed('load.refresh'):
+            n_new = refresh_ledger(ledger)
+        if n_new is None:
+            # Dữ liệu cũ trong file đã bị sửa: tải lại toàn bộ
+            load_ledger.clear()
+            st.rerun()
+        if n_new:
+            # Công bố bản mới cho các process khác; lần chạy sau process này cũng gắn lại vào kho
+            try:
+                ledger['version'] = publish_ledger(ledger)
+                load_ledger.clear()
+            except OSError:
+                pass
+        st.sidebar.success(f"✅ Đã nạp {n_new} giao dịch mới")
+    
+    # Thông tin chẩn đoán khi đọc file nguồn
+    decode = ledger['decode']
+    st.sidebar.caption(
+        f"Encoding: `{decode['encoding']}`{' (đã sửa mojibake)' if decode['repair'] else ''} · "
+        f"đoán {decode['detect_ms']:.1f} ms · giải mã {decode['decode_ms']:.0f} ms"
+    )
     
     # Thêm hướng dẫn vào sidebar
     st.sidebar.markdown("---")
@@ -241,7 +397,7 @@ def main():
         - Hiệu suất đầu tư (%)
         - Lịch sử chi tiết (có thể mở rộng)
         - Biểu đồ tích lũy (nếu có nhiều giao dịch)
-        - **Nút tải báo cáo Excel** 📥
+        - **Nút tạo & tải báo cáo Excel/CSV** 📥
         """)
     
     # Hiển thị ID mẫu giả định trong sidebar (để bảo vệ thông tin thật)
@@ -267,11 +423,20 @@ def main():
     # Xử lý tìm kiếm và lưu kết quả vào session state
     if search_button and shareholder_id:
         # Lưu kết quả tìm kiếm vào session state
-        search_data = df[df[COL_ID].str.upper() == shareholder_id].copy()
+        # Lấy chỉ mục, bảng tổng hợp và phiên bản cùng lúc (sau khi làm mới để dùng dữ liệu
+        # mới nhất): phiên khác có thể đang làm mới sổ
+        with ledger['lock']:
+            id_index, holders, data_version = ledger['index'], ledger['holders'], ledger['sha256']
+        with perf_metrics.timed('page.lookup'):
+            search_data = lookup_shareholder(id_index, shareholder_id)
+            summary = lookup_summary(holders, shareholder_id)
         st.session_state.search_results = {
             'shareholder_id': shareholder_id,
             'current_price': current_price,
             'data': search_data,
+            'summary': summary,
+            # Phiên bản dữ liệu của lịch sử vừa tra, dùng làm khóa cache dùng chung giữa các phiên
+            'data_version': data_version,
             'search_performed': True
         }
     
@@ -287,10 +452,18 @@ def main():
         result_shareholder_id = search_data['shareholder_id'] 
         base_price = search_data['current_price']
         shareholder_data = search_data['data']
+        summary = search_data['summary']
+        data_version = search_data['data_version']
         
-        if shareholder_data.empty:
+        if summary is None or shareholder_data.empty:
             st.error(f"❌ Không tìm thấy thông tin cho ID: **{result_shareholder_id}**")
             
+            # Gợi ý ID gần đúng: chỉ hiện ID đã che số tài khoản, không hiện thông tin cổ đông khác
+            suggestion_index = load_suggestion_index(ledger['sha256'], ledger['holders'].index)
+            suggestions = suggest_ids(suggestion_index, result_shareholder_id)
+            if suggestions:
+                st.info("🔎 **Có phải bạn muốn tìm:** " + ", ".join(f"`{mask_id(value)}`" for value in suggestions))
+            
             # Hiển thị gợi ý
             col1, col2 = st.columns(2)
             with col1:
@@ -306,17 +479,16 @@ def main():
                 st.write("• LEHIEUQUANG987654")
                      
         else:
-            # Sắp xếp theo ngày
-            shareholder_data = shareholder_data.sort_values(COL_DATE_DATETIME)
-            
             # Thông tin cổ đông với lời chào cá nhân hóa
-            shareholder_name = shareholder_data[COL_SHAREHOLDER].iloc[0]
+            shareholder_name = summary[COL_SHAREHOLDER]
             st.success(f"👋 **Xin chào, {shareholder_name}!** Dưới đây là thông tin đầu tư của bạn.")
             st.markdown(f"🆔 **ID:** {result_shareholder_id}")
             
-            # Tính toán các chỉ số cơ bản với xử lý lỗi
-            total_investment = shareholder_data[COL_TOTAL_MONEY_CLEAN].sum()
-            total_dvdt = shareholder_data[COL_QUANTITY_DVDT_CLEAN].sum()
+            # Các chỉ số cơ bản lấy từ bảng tổng hợp tính sẵn khi tải dữ liệu
+            total_investment = summary[COL_TOTAL_MONEY_CLEAN]
+            total_dvdt = summary[COL_QUANTITY_DVDT_CLEAN]
+            transaction_count = int(summary[COL_TX_COUNT])
+            # Một cổ đông, một mức giá: tính thẳng trên số vô hướng như phần What-if
             base_nav = total_dvdt * base_price
             base_performance = calculate_performance(base_nav, total_investment)
             
@@ -361,21 +533,39 @@ def main():
                             delta=f"{base_performance:.2f}%"
                         )
                 
+                # XIRR/TWR đọc từ bảng lợi suất cả quỹ (tính một lần cho mỗi mức giá và phiên bản dữ liệu).
+                # Sổ đã được làm mới sau lần tra cứu thì bỏ qua: không trộn tổng hợp cũ với lợi suất mới
+                with ledger['lock']:
+                    same_version = ledger['sha256'] == data_version
+                fund_table = fund_returns(ledger, base_price) if same_version else None
+                # Cổ đông có thể đã bị đổi/xóa ID trong lần làm mới: không có dòng thì ẩn khối này
+                if fund_table is not None and normalize_id(result_shareholder_id) in fund_table.index:
+                    returns = fund_table.loc[normalize_id(result_shareholder_id)]
+                    return_col1, return_col2 = st.columns(2)
+                    
+                    with return_col1:
+                        st.metric(
+                            label="⏱️ XIRR (theo năm)",
+                            value=format_percent(returns[COL_XIRR]),
+                            help="Lợi suất có tính đến thời điểm và số tiền của từng lần nộp, quy về một năm"
+                        )
+                    
+                    with return_col2:
+                        st.metric(
+                            label="📐 TWR",
+                            value=format_percent(returns[COL_TWR]),
+                            help="Lợi suất theo thời gian: chỉ phụ thuộc biến động giá ĐVĐT từ lần mua đầu tiên, "
+                                 f"không phụ thuộc số tiền nộp. Quy về năm: {format_percent(returns[COL_TWR_ANNUAL])}"
+                        )
+                
                 # Sử dụng expander cho lịch sử giao dịch chi tiết
                 with st.expander("📋 Xem chi tiết lịch sử giao dịch", expanded=False):
                     # Tạo bảng hiển thị với thông tin đầy đủ và giá mua trung bình
-                    display_data = shareholder_data[[COL_DATE, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_BANK]].copy()
-                    
-                    # Tính toán các cột tích lũy và giá mua trung bình
-                    display_data['Tích_lũy_tiền'] = display_data[COL_TOTAL_MONEY_CLEAN].cumsum()
-                    display_data['Tích_lũy_ĐVĐT'] = display_data[COL_QUANTITY_DVDT_CLEAN].cumsum()
-                    
-                    # Tính giá mua trung bình (tránh chia cho 0)
-                    display_data['Giá_mua_trung_bình'] = np.where(
-                        display_data['Tích_lũy_ĐVĐT'] > 0,
-                        display_data['Tích_lũy_tiền'] / display_data['Tích_lũy_ĐVĐT'],
-                        0
-                    )
+                    # (các cột tích lũy và giá mua trung bình đã tính sẵn trong chỉ mục)
+                    display_data = shareholder_data[[
+                        COL_DATE, COL_TOTAL_MONEY_CLEAN, COL_PRICE_DVDT_CLEAN, COL_QUANTITY_DVDT_CLEAN, COL_BANK,
+                        COL_CUM_MONEY, COL_CUM_DVDT, COL_AVG_PRICE
+                    ]].copy()
                     
                     # Đổi tên cột cho thân thiện
                     display_data.columns = [
@@ -385,118 +575,73 @@ def main():
                     ]
                     
                     # Hiển thị với định dạng số đẹp
-                    st.dataframe(
-                        display_data.style.format({
-                            'Số tiền đầu tư (VNĐ)': '{:,.0f}',
-                            'Giá ĐVĐT (VNĐ)': '{:,.0f}',
-                            'Số ĐVĐT mua': '{:,.3f}',
-                            'Tích lũy tiền (VNĐ)': '{:,.0f}',
-                            'Tích lũy ĐVĐT': '{:,.3f}',
-                            'Giá mua TB (VNĐ)': '{:,.0f}'
-                        }),
-                        use_container_width=True
-                    )
-                    
-                    # Nút tải báo cáo
-                    try:
-                        excel_data = create_download_data(shareholder_data, shareholder_name)
-                        st.download_button(
-                            label="📥 Tải báo cáo Excel",
-                            data=excel_data,
-                            file_name=f"Bao_cao_dau_tu_{result_shareholder_id}_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            help="Tải xuống báo cáo đầu tư chi tiết dạng Excel"
+                    with perf_metrics.timed('page.table'):
+                        st.dataframe(
+                            display_data.style.format({
+                                'Số tiền đầu tư (VNĐ)': '{:,.0f}',
+                                'Giá ĐVĐT (VNĐ)': '{:,.0f}',
+                                'Số ĐVĐT mua': '{:,.3f}',
+                                'Tích lũy tiền (VNĐ)': '{:,.0f}',
+                                'Tích lũy ĐVĐT': '{:,.3f}',
+                                'Giá mua TB (VNĐ)': '{:,.0f}'
+                            }),
+                            use_container_width=True
                         )
-                    except Exception as e:
-                        st.warning(f"⚠️ Không thể tạo file Excel: {e}")
-                        st.info("💡 Vui lòng cài đặt: `pip install openpyxl`")
+                    
+                    # Nút tải báo cáo: chỉ tạo file khi được yêu cầu, dùng lại bản đã tạo
+                    # cho cùng ID + phiên bản dữ liệu + định dạng
+                    report_label = st.radio("Định dạng báo cáo:", list(REPORT_FORMATS), horizontal=True, key="report_format")
+                    file_format, mime = REPORT_FORMATS[report_label]
+                    report_key = (normalize_id(result_shareholder_id), data_version, file_format)
+                    if st.button("📄 Tạo báo cáo", help="Tạo báo cáo đầu tư chi tiết để tải xuống"):
+                        st.session_state.report_request = report_key
+                    
+                    if st.session_state.get('report_request') == report_key:
+                        try:
+                            report_data = get_report(
+                                load_report_cache(), report_key,
+                                lambda: create_download_data(shareholder_data, shareholder_name, file_format)
+                            )
+                            st.download_button(
+                                label=f"📥 Tải báo cáo {report_label}",
+                                data=report_data,
+                                file_name=report_file_name(result_shareholder_id, file_format),
+                                mime=mime,
+                                help=f"Tải xuống báo cáo đầu tư chi tiết dạng {report_label}"
+                            )
+                        except Exception as e:
+                            st.warning(f"⚠️ Không thể tạo file {report_label}: {e}")
+                            st.info("💡 Vui lòng cài đặt: `pip install xlsxwriter` hoặc `pip install openpyxl`")
                     
                     # Thống kê nhanh
                     st.markdown("**📈 Thống kê nhanh:**")
                     stats_col1, stats_col2, stats_col3 = st.columns(3)
                     with stats_col1:
-                        st.metric("Số lần giao dịch", len(shareholder_data))
+                        st.metric("Số lần giao dịch", transaction_count)
                     with stats_col2:
                         st.metric("Tổng đầu tư", f"{format_currency(total_investment)} VNĐ")
                     with stats_col3:
-                        if len(shareholder_data) > 1:
-                            last_date = shareholder_data[COL_DATE_DATETIME].max().strftime('%d/%m/%Y')
+                        if transaction_count > 1:
+                            last_date = summary[COL_LAST_DATE].strftime('%d/%m/%Y')
                             st.metric("Lần gần nhất", last_date)
                         else:
-                            first_date = shareholder_data[COL_DATE_DATETIME].min().strftime('%d/%m/%Y')
+                            first_date = summary[COL_FIRST_DATE].strftime('%d/%m/%Y')
                             st.metric("Ngày đầu tư", first_date)
             
             with col2:
-                st.subheader("🎯 Mô phỏng What-if")
-                st.markdown("*Thay đổi giá để xem NAV khác nhau:*")
-                
-                # Slider cho tính năng What-if
-                min_price = max(1000, base_price * 0.5)
-                max_price = base_price * 2
-                
-                whatif_price = st.slider(
-                    "Giá ĐVĐT giả định (VNĐ):",
-                    min_value=int(min_price),
-                    max_value=int(max_price),
-                    value=int(base_price),
-                    step=100,
-                    format="%d",
-                    help="Kéo thanh trượt để xem NAV thay đổi real-time",
-                    key="whatif_slider"  # Thêm key để tránh conflict
-                )
-                
-                # Tính toán real-time với xử lý lỗi
-                whatif_nav = total_dvdt * whatif_price
-                whatif_performance = calculate_performance(whatif_nav, total_investment)
-                nav_difference = whatif_nav - base_nav
-                performance_difference = whatif_performance - base_performance
-                
-                # Hiển thị kết quả What-if
-                st.markdown("**🔮 Kết quả mô phỏng:**")
-                
-                st.metric(
-                    label="NAV giả định",
-                    value=f"{format_currency(whatif_nav)} VNĐ",
-                    delta=f"{format_currency(nav_difference)} VNĐ"
-                )
-                
-                st.metric(
-                    label="Hiệu suất giả định",
-                    value=f"{whatif_performance:.2f}%",
-                    delta=f"{performance_difference:.2f}%"
-                )
-                
-                # Hiển thị bảng so sánh
-                st.markdown("**📊 Bảng so sánh:**")
-                comparison_data = pd.DataFrame({
-                    'Chỉ số': ['Giá ĐVĐT', 'NAV', 'Hiệu suất'],
-                    'Hiện tại': [
-                        f"{format_currency(base_price)} VNĐ",
-                        f"{format_currency(base_nav)} VNĐ", 
-                        f"{base_performance:.2f}%"
-                    ],
-                    'Giả định': [
-                        f"{format_currency(whatif_price)} VNĐ",
-                        f"{format_currency(whatif_nav)} VNĐ",
-                        f"{whatif_performance:.2f}%"
-                    ]
-                })
-                st.dataframe(comparison_data, use_container_width=True, hide_index=True)
+                render_whatif_panel(total_investment, total_dvdt, base_price, base_nav, base_performance)
             
             # Biểu đồ nâng cao với Altair (nếu có nhiều giao dịch)
-            if len(shareholder_data) > 1:
+            if transaction_count > 1:
                 st.subheader("📈 Biểu đồ Lịch sử Đầu tư")
                 
-                # Chuẩn bị dữ liệu cho biểu đồ
-                chart_data = shareholder_data.copy()
-                chart_data['Tích lũy tiền'] = chart_data[COL_TOTAL_MONEY_CLEAN].cumsum()
-                chart_data['Tích lũy ĐVĐT'] = chart_data[COL_QUANTITY_DVDT_CLEAN].cumsum()
+                if transaction_count > CHART_MAX_POINTS:
+                    st.caption(f"📉 Lịch sử dài: biểu đồ hiển thị {CHART_MAX_POINTS} điểm tiêu biểu; "
+                               "tiền/ĐVĐT mua thêm ở mỗi điểm tính từ điểm trước đó")
                 
-                # Tính giá mua trung bình cho tooltip
-                chart_data['Giá mua TB'] = np.where(
-                    chart_data['Tích lũy ĐVĐT'] > 0,
-                    chart_data['Tích lũy tiền'] / chart_data['Tích lũy ĐVĐT'],
-                    0
+                # Khóa theo phiên bản của lịch sử đã tra (không phải của sổ hiện tại): cache dùng chung
+                invest_spec, units_spec = history_chart_specs(
+                    data_version, normalize_id(result_shareholder_id), shareholder_data
                 )
                 
                 chart_col1, chart_col2 = st.columns(2)
@@ -504,43 +649,34 @@ def main():
                 with chart_col1:
                     st.markdown("**💰 Tích lũy số tiền đầu tư**")
                     
-                    chart_invest = alt.Chart(chart_data).mark_line(
-                        point=alt.OverlayMarkDef(filled=False, fill="white", size=50),
-                        strokeWidth=3,
-                        color='#1f77b4'
-                    ).encode(
-                        x=alt.X(f'{COL_DATE_DATETIME}:T', title='Ngày', axis=alt.Axis(format='%d/%m')),
-                        y=alt.Y('Tích lũy tiền:Q', title='Tổng tiền đầu tư (VNĐ)', axis=alt.Axis(format=',.0f')),
-                        tooltip=[
-                            alt.Tooltip(f'{COL_DATE_DATETIME}:T', title='Ngày giao dịch', format='%d/%m/%Y'),
-                            alt.Tooltip(f'{COL_TOTAL_MONEY_CLEAN}:Q', title='Tiền đầu tư thêm', format=',.0f'),
-                            alt.Tooltip('Tích lũy tiền:Q', title='Tổng tiền tích lũy', format=',.0f'),
-                            alt.Tooltip('Giá mua TB:Q', title='Giá mua trung bình', format=',.0f')
-                        ]
-                    ).interactive()
-                    
-                    st.altair_chart(chart_invest, use_container_width=True)
+                    # Thời gian gửi spec (đã giảm điểm, lấy từ cache) lên trình duyệt
+                    with perf_metrics.timed('page.chart'):
+                        st.vega_lite_chart(invest_spec, use_container_width=True)
                 
                 with chart_col2:
                     st.markdown("**📈 Tích lũy ĐVĐT sở hữu**")
                     
-                    chart_units = alt.Chart(chart_data).mark_line(
-                        point=alt.OverlayMarkDef(filled=False, fill="white", size=50),
-                        strokeWidth=3,
-                        color='#ff7f0e'
-                    ).encode(
-                        x=alt.X(f'{COL_DATE_DATETIME}:T', title='Ngày', axis=alt.Axis(format='%d/%m')),
-                        y=alt.Y('Tích lũy ĐVĐT:Q', title='Tổng ĐVĐT sở hữu', axis=alt.Axis(format=',.1f')),
-                        tooltip=[
-                            alt.Tooltip(f'{COL_DATE_DATETIME}:T', title='Ngày giao dịch', format='%d/%m/%Y'),
-                            alt.Tooltip(f'{COL_PRICE_DVDT_CLEAN}:Q', title='Giá tại ngày mua', format=',.0f'),
-                            alt.Tooltip(f'{COL_QUANTITY_DVDT_CLEAN}:Q', title='ĐVĐT mua thêm', format=',.3f'),
-                            alt.Tooltip('Tích lũy ĐVĐT:Q', title='Tổng ĐVĐT tích lũy', format=',.3f'),
-                            alt.Tooltip('Giá mua TB:Q', title='Giá mua trung bình', format=',.0f')
-                        ]
-                    ).interactive()
-                    
-                    st.altair_chart(chart_units, use_container_width=True)
+                    with perf_metrics.timed('page.chart'):
+                        st.vega_lite_chart(units_spec, use_container_width=True)
+            
+            # NAV theo thời gian: lấy phần của cổ đông trong bảng NAV cuối kỳ đã tính sẵn cho cả quỹ
+            nav_history = None if snapshots is None else holder_nav_history(snapshots, result_shareholder_id)
+            if nav_history is not None and len(nav_history) > 1:
+                st.subheader("💎 NAV theo thời gian")
+                if snapshots['version'] == 'ledger':
+                    price_source = f"giá mua của các giao dịch (chưa có file `{PRICE_FILE}`)"
+                else:
+                    price_source = f"file `{PRICE_FILE}`"
+                st.caption(f"NAV tại cuối mỗi tháng và ngày có giá mới nhất, theo giá ĐVĐT từ {price_source}")
+                
+                nav_spec = nav_chart_spec(
+                    ledger['sha256'], snapshots['version'], normalize_id(result_shareholder_id), nav_history
+                )
+                with perf_metrics.timed('page.chart'):
+                    st.vega_lite_chart(nav_spec, use_container_width=True)
+    
+    render_issues_panel(ledger)
+    render_metrics_panel()
     
     # Thông tin footer
     st.markdown("---")